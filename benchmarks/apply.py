@@ -0,0 +1,50 @@
+import time
+import argparse
+import statistics
+
+# Local imports
+import lib.window_manager as window_manager
+from lib.utils import WindowRule
+from benchmarks.fake_desktop import FakeDesktop
+
+# Wall-clock time of apply_window_configs against the number of windows, on the simulated backend,
+# taken from the timings of the returned ApplyResult. Run from the repository root:
+#   python -m benchmarks.apply --windows 1 4 8 16 32 --hung 1
+
+def make_rule(index):
+    return WindowRule(section=f"Window {index}", matcher=f"Window {index}", search_title=f"Window {index}",
+                      position=(index * 40, index * 30), size=(1280, 720),
+                      always_on_top=index % 2 == 0, has_titlebar=index % 3 != 0, tolerance=0)
+
+def measure(count, args):
+    desktop = FakeDesktop(call_ms=args.call_ms, repaint_ms=args.repaint_ms)
+    placements = []
+    for index in range(count):
+        hwnd = desktop.add_window(f"Window {index}", hung=index < args.hung)
+        placements.append((hwnd, make_rule(index)))
+    desktop.install(window_manager)
+    manager = window_manager.WindowManager()
+
+    start = time.perf_counter()
+    result = manager.apply_window_configs(placements)
+    wall_ms = (time.perf_counter() - start) * 1000
+    prepared = [window.elapsed_ms for window in result.windows if window.status == "placed"]
+    return wall_ms, result, statistics.median(prepared) if prepared else 0.0, desktop.repaints
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply time of a config against the number of windows")
+    parser.add_argument("--windows", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--call-ms", type=float, default=1.0, help="Simulated message round trip")
+    parser.add_argument("--repaint-ms", type=float, default=4.0, help="Simulated repaint")
+    parser.add_argument("--hung", type=int, default=0, help="Number of hung windows in each run")
+    args = parser.parse_args()
+
+    print(f"{'windows':>8} {'wall ms':>9} {'total ms':>9} {'commit ms':>10} {'window median ms':>17} "
+          f"{'repaints':>9} {'unresponsive':>13}")
+    for count in args.windows:
+        wall_ms, result, window_ms, repaints = measure(count, args)
+        print(f"{count:>8} {wall_ms:>9.1f} {result.total_ms:>9.1f} {result.commit_ms:>10.1f} {window_ms:>17.1f} "
+              f"{repaints:>9} {len(result.unresponsive):>13}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import time
+import win32con
+
+# Simulated window backend for the benchmarks.
+# Replaces the Win32 calls made by lib.window_manager with an in-memory desktop where every call that
+# would send a message to the target window costs call_ms, and every visible change costs repaint_ms.
+# Hung windows block synchronous calls for hang_ms, as a real hung window blocks until it responds.
+
+class FakeWindow:
+    def __init__(self, hwnd, title, rect, style, exstyle=0, hung=False):
+        self.hwnd = hwnd
+        self.title = title
+        self.rect = rect
+        self.style = style
+        self.exstyle = exstyle
+        self.hung = hung
+        self.iconic = False
+
+
+class FakeDesktop:
+    def __init__(self, call_ms=1.0, repaint_ms=4.0, hang_ms=2000.0):
+        self.call = call_ms / 1000
+        self.repaint = repaint_ms / 1000
+        self.hang = hang_ms / 1000
+        self.windows = {}
+        self.calls = 0
+        self.repaints = 0
+        self._batches = {}
+        self._next_handle = 1
+
+    def add_window(self, title, rect=(0, 0, 800, 600), hung=False):
+        hwnd = 0x1000 + len(self.windows) * 4
+        style = win32con.WS_OVERLAPPEDWINDOW | win32con.WS_VISIBLE
+        self.windows[hwnd] = FakeWindow(hwnd, title, rect, style, hung=hung)
+        return hwnd
+
+    def reset_counters(self):
+        self.calls = 0
+        self.repaints = 0
+
+    def _send(self, hwnd, asynchronous=False):
+        # One message round trip to the window's thread
+        self.calls += 1
+        window = self.windows.get(hwnd)
+        if asynchronous:
+            return
+        if window and window.hung:
+            time.sleep(self.hang)
+        else:
+            time.sleep(self.call)
+
+    def _paint(self):
+        self.repaints += 1
+        time.sleep(self.repaint)
+
+    def _position(self, hwnd, insert_after, x, y, cx, cy, flags):
+        window = self.windows[hwnd]
+        left, top, right, bottom = window.rect
+        if not flags & win32con.SWP_NOMOVE:
+            left, top, right, bottom = x, y, x + right - left, y + bottom - top
+        if not flags & win32con.SWP_NOSIZE:
+            right, bottom = left + cx, top + cy
+        window.rect = (left, top, right, bottom)
+        if not flags & win32con.SWP_NOZORDER:
+            if insert_after == win32con.HWND_TOPMOST:
+                window.exstyle |= win32con.WS_EX_TOPMOST
+            elif insert_after == win32con.HWND_NOTOPMOST:
+                window.exstyle &= ~win32con.WS_EX_TOPMOST
+
+    def install(self, module):
+        # Swaps the backend of lib.window_manager (or any module using the same names) for this desktop
+        module.win32gui = FakeWin32Gui(self)
+        module._user32 = FakeUser32(self)
+        module._dwmapi = FakeDwmApi()
+
+
+class FakeWin32Gui:
+    def __init__(self, desktop):
+        self.desktop = desktop
+
+    def IsWindow(self, hwnd):
+        return 1 if hwnd in self.desktop.windows else 0
+
+    def IsWindowVisible(self, hwnd):
+        return hwnd in self.desktop.windows
+
+    def IsIconic(self, hwnd):
+        return self.desktop.windows[hwnd].iconic
+
+    def ShowWindow(self, hwnd, command):
+        self.desktop._send(hwnd)
+        self.desktop.windows[hwnd].iconic = False
+        self.desktop._paint()
+
+    def SetForegroundWindow(self, hwnd):
+        self.desktop._send(hwnd)
+
+    def GetForegroundWindow(self):
+        return 0
+
+    def GetWindowText(self, hwnd):
+        self.desktop._send(hwnd)
+        return self.desktop.windows[hwnd].title
+
+    def GetClassName(self, hwnd):
+        return "FakeWindow"
+
+    def EnumWindows(self, callback, extra):
+        for hwnd in list(self.desktop.windows):
+            if not callback(hwnd, extra):
+                break
+
+    def GetWindowRect(self, hwnd):
+        return self.desktop.windows[hwnd].rect
+
+    def GetWindowLong(self, hwnd, index):
+        window = self.desktop.windows[hwnd]
+        return window.exstyle if index == win32con.GWL_EXSTYLE else window.style
+
+    def SetWindowLong(self, hwnd, index, value):
+        # Style changes send WM_STYLECHANGING and WM_STYLECHANGED to the window
+        self.desktop._send(hwnd)
+        window = self.desktop.windows[hwnd]
+        if index == win32con.GWL_EXSTYLE:
+            window.exstyle = value
+        else:
+            window.style = value
+
+    def SetWindowPos(self, hwnd, insert_after, x, y, cx, cy, flags):
+        self.desktop._send(hwnd, asynchronous=bool(flags & win32con.SWP_ASYNCWINDOWPOS))
+        self.desktop._position(hwnd, insert_after, x, y, cx, cy, flags)
+        self.desktop._paint()
+
+
+class FakeUser32:
+    def __init__(self, desktop):
+        self.desktop = desktop
+
+    def BeginDeferWindowPos(self, count):
+        handle = self.desktop._next_handle
+        self.desktop._next_handle += 1
+        self.desktop._batches[handle] = []
+        return handle
+
+    def DeferWindowPos(self, hdwp, hwnd, insert_after, x, y, cx, cy, flags):
+        if hwnd not in self.desktop.windows:
+            self.desktop._batches.pop(hdwp, None)
+            return 0
+        self.desktop._batches[hdwp].append((hwnd, insert_after, x, y, cx, cy, flags))
+        return hdwp
+
+    def EndDeferWindowPos(self, hdwp):
+        # Every window is still asked for its new position, but the desktop is repainted once
+        batch = self.desktop._batches.pop(hdwp, None)
+        if batch is None:
+            return 0
+        for placement in batch:
+            self.desktop._send(placement[0])
+            self.desktop._position(*placement)
+        self.desktop._paint()
+        return 1
+
+    def SendMessageTimeoutW(self, hwnd, message, wparam, lparam, flags, timeout_ms, result):
+        # Returns 0 like a timeout when the window is hung, after waiting at most timeout_ms
+        window = self.desktop.windows.get(hwnd)
+        self.desktop.calls += 1
+        if window and window.hung:
+            time.sleep(min(self.desktop.hang, timeout_ms / 1000))
+            return 0
+        time.sleep(self.desktop.call)
+        return 1
+
+    def IsHungAppWindow(self, hwnd):
+        window = self.desktop.windows.get(hwnd)
+        return 1 if window and window.hung else 0
+
+
+class FakeDwmApi:
+    def DwmGetWindowAttribute(self, hwnd, attribute, value, size):
+        # Not supported, the window rect is used as the frame
+        return 1
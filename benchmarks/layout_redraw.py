@@ -0,0 +1,75 @@
+import time
+import argparse
+import tempfile
+import statistics
+import tkinter as tk
+
+# Local imports
+from lib.layout import ScreenLayoutFrame
+from lib.utils import WindowInfo
+
+# Redraw time of the layout preview per frame, while resizing and when switching configs.
+# Run from the repository root:
+#   python -m benchmarks.layout_redraw --windows 4 64
+
+SCREEN = (1920, 1080)
+
+def make_windows(count, shift=0):
+    # A grid of windows covering the screen, shift moves every window to simulate another config
+    columns = max(1, round(count ** 0.5))
+    rows = -(-count // columns)
+    width, height = SCREEN[0] // columns, SCREEN[1] // rows
+    return [WindowInfo(f"Window {index}",
+                       (index % columns) * width + shift, (index // columns) * height,
+                       width - shift, height,
+                       index % 3 == 0, index % 5 != 0, f"Window {index}")
+            for index in range(count)]
+
+def summary(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1], samples[-1]
+
+def measure(root, count, frames, assets_dir):
+    frame = ScreenLayoutFrame(root, *SCREEN, make_windows(count), assets_dir)
+    frame.pack(fill=tk.BOTH, expand=True)
+    root.update()
+
+    # Resize, every frame scales the existing items
+    resize = []
+    for index in range(frames):
+        width = 600 + (index % 200) * 2
+        frame.draw_layout(width, width * 9 // 16, fast=True)
+        root.update_idletasks()
+        resize.append(frame.last_draw_ms)
+
+    # Config switch, alternating between two layouts with the same window names
+    switch = []
+    layouts = (make_windows(count), make_windows(count, shift=20))
+    for index in range(frames):
+        start = time.perf_counter()
+        # Reuses the items and redraws
+        frame.set_windows(layouts[index % 2])
+        root.update_idletasks()
+        switch.append((time.perf_counter() - start) * 1000)
+
+    frame.destroy()
+    return summary(resize), summary(switch)
+
+def main():
+    parser = argparse.ArgumentParser(description="Layout preview redraw time per frame")
+    parser.add_argument("--windows", type=int, nargs="+", default=[4, 64])
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    root.geometry("1000x600")
+    with tempfile.TemporaryDirectory() as assets_dir:
+        print(f"{'windows':>8} {'resize median/p95/max ms':>26} {'switch median/p95/max ms':>26}")
+        for count in args.windows:
+            resize, switch = measure(root, count, args.frames, assets_dir)
+            print(f"{count:>8} {'/'.join(f'{value:.2f}' for value in resize):>26} "
+                  f"{'/'.join(f'{value:.2f}' for value in switch):>26}")
+    root.destroy()
+
+if __name__ == "__main__":
+    main()
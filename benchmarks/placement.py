@@ -0,0 +1,68 @@
+import time
+import argparse
+import win32con
+
+# Local imports
+import lib.window_manager as window_manager
+from benchmarks.fake_desktop import FakeDesktop
+
+# Apply latency of the batched DeferWindowPos placement against the per-call path it replaced,
+# on the simulated backend. Run from the repository root:
+#   python -m benchmarks.placement --windows 1 4 8 16
+
+def make_desktop(count, args):
+    desktop = FakeDesktop(call_ms=args.call_ms, repaint_ms=args.repaint_ms)
+    hwnds = [desktop.add_window(f"Window {index}") for index in range(count)]
+    desktop.install(window_manager)
+    return desktop, hwnds
+
+def target(index):
+    return (index * 40, index * 30), (1280, 720)
+
+def per_call(manager, hwnds, sleep):
+    # Frame, position, size and topmost set one call at a time, as before the placement engine
+    for index, hwnd in enumerate(hwnds):
+        position, size = target(index)
+        manager.keep_titlebar(hwnd)
+        time.sleep(sleep)
+        manager.set_window_position(hwnd, *position)
+        time.sleep(sleep)
+        manager.set_window_size(hwnd, *size)
+        time.sleep(sleep)
+        manager.set_always_on_top(hwnd, True)
+        time.sleep(sleep)
+
+def batched(manager, hwnds):
+    pending = []
+    for index, hwnd in enumerate(hwnds):
+        position, size = target(index)
+        flags = win32con.SWP_NOACTIVATE | win32con.SWP_NOOWNERZORDER
+        if manager.set_frame_style(hwnd, False):
+            flags |= win32con.SWP_FRAMECHANGED
+        pending.append((hwnd, win32con.HWND_TOPMOST, *position, *size, flags))
+    manager.commit_window_positions(pending)
+
+def measure(func, count, args, *extra):
+    desktop, hwnds = make_desktop(count, args)
+    manager = window_manager.WindowManager()
+    start = time.perf_counter()
+    func(manager, hwnds, *extra)
+    return (time.perf_counter() - start) * 1000, desktop.calls, desktop.repaints
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-call SetWindowPos against one DeferWindowPos transaction")
+    parser.add_argument("--windows", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--call-ms", type=float, default=1.0, help="Simulated message round trip")
+    parser.add_argument("--repaint-ms", type=float, default=4.0, help="Simulated repaint")
+    parser.add_argument("--sleep", type=float, default=0.1, help="Sleep after each per-call step, 0.1 before the engine")
+    args = parser.parse_args()
+
+    print(f"{'windows':>8} {'per-call ms':>12} {'repaints':>9} {'batched ms':>11} {'repaints':>9} {'speedup':>8}")
+    for count in args.windows:
+        per_call_ms, _, per_call_paints = measure(per_call, count, args, args.sleep)
+        batched_ms, _, batched_paints = measure(batched, count, args)
+        print(f"{count:>8} {per_call_ms:>12.1f} {per_call_paints:>9} {batched_ms:>11.1f} {batched_paints:>9} "
+              f"{per_call_ms / batched_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
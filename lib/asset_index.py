@@ -0,0 +1,185 @@
+import os
+import json
+import hashlib
+import threading
+from dataclasses import dataclass, asdict
+from PIL import Image
+
+# Local imports
+from lib.dir_watcher import REMOVED
+
+IMAGE_EXTENSIONS = (".jpg", ".png")
+
+
+def asset_key(title):
+    # Normalized title, matches the asset file naming and the case insensitive Windows file system
+    return title.replace(' ', '_').replace(':', '').lower()
+
+
+@dataclass(frozen=True, slots=True)
+class AssetFile:
+    filename: str
+    format: str
+    file_size: int
+    mtime_ns: int
+    width: int
+    height: int
+    sha1: str
+
+    @property
+    def is_dummy(self):
+        # Placeholder written for titles without a match by earlier versions
+        return self.width == 1 and self.height == 1
+
+
+class AssetIndex:
+    # In-memory index of the assets folder by normalized title.
+    # Empty until load() has built it from a single directory listing, after which lookups never
+    # touch the file system. Kept current by the asset manager and the assets folder watcher.
+    INDEX_FILE = ".asset_index.json"
+    VERSION = 1
+
+    def __init__(self, assets_dir):
+        self.assets_dir = assets_dir
+        self.index_path = os.path.join(assets_dir, self.INDEX_FILE)
+        self.assets = {}
+        self.loaded = threading.Event()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_asset_file(name):
+        return name.lower().endswith(IMAGE_EXTENSIONS)
+
+    def load(self):
+        # Hashes and image headers are only read again for files changed since the index was saved
+        known = {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                known = {entry['filename']: AssetFile(**entry) for entry in data.get('files', [])}
+        except (OSError, ValueError, TypeError, KeyError):
+            known = {}
+
+        assets = {}
+        changed = False
+        try:
+            with os.scandir(self.assets_dir) as it:
+                for entry in it:
+                    if not entry.is_file() or not self.is_asset_file(entry.name):
+                        continue
+                    stat = entry.stat()
+                    asset = known.get(entry.name)
+                    if not asset or asset.mtime_ns != stat.st_mtime_ns or asset.file_size != stat.st_size:
+                        asset = self._read(entry.name, stat)
+                        changed = True
+                    if asset:
+                        self._add(assets, asset)
+        except OSError as e:
+            print(f"Failed to scan {self.assets_dir}: {e}")
+
+        with self._lock:
+            self.assets = assets
+        self.loaded.set()
+        if changed or len(known) != sum(len(files) for files in assets.values()):
+            self._save()
+
+    def _read(self, filename, stat=None):
+        path = os.path.join(self.assets_dir, filename)
+        try:
+            stat = stat or os.stat(path)
+            digest = hashlib.sha1()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            with Image.open(path) as image:
+                image_format = image.format
+                width, height = image.size
+        except Exception as e:
+            print(f"Failed to index asset {path}: {e}")
+            return None
+
+        return AssetFile(
+            filename=filename,
+            format=image_format,
+            file_size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            width=width,
+            height=height,
+            sha1=digest.hexdigest(),
+        )
+
+    @staticmethod
+    def _add(assets, asset):
+        stem, ext = os.path.splitext(asset.filename)
+        files = dict(assets.get(stem.lower(), {}))
+        files[ext.lower()] = asset
+        assets[stem.lower()] = files
+
+    def _save(self):
+        with self._lock:
+            files = [asdict(asset) for assets in self.assets.values() for asset in assets.values()]
+        tmp_path = f"{self.index_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.VERSION, 'files': files}, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"Failed to save asset index: {e}")
+
+    def lookup(self, title):
+        # The asset for a title, .jpg preferred over .png
+        files = self.assets.get(asset_key(title))
+        if not files:
+            return None
+        for ext in IMAGE_EXTENSIONS:
+            if ext in files:
+                return files[ext]
+        return None
+
+    def path(self, asset):
+        return os.path.join(self.assets_dir, asset.filename)
+
+    def update(self, filename):
+        # Re-reads one stored or changed asset, returns False if it is no longer readable
+        asset = self._read(filename)
+        if asset is None:
+            self.discard(filename)
+            return False
+        with self._lock:
+            self._add(self.assets, asset)
+        self._save()
+        return True
+
+    def discard(self, filename):
+        stem, ext = os.path.splitext(filename)
+        with self._lock:
+            files = self.assets.get(stem.lower())
+            if not files or ext.lower() not in files:
+                return
+            files = {key: asset for key, asset in files.items() if key != ext.lower()}
+            if files:
+                self.assets[stem.lower()] = files
+            else:
+                del self.assets[stem.lower()]
+        self._save()
+
+    def apply_changes(self, changes):
+        # DirectoryWatcher callback format, {filename: action}
+        for filename, action in changes.items():
+            if action == REMOVED:
+                self.discard(filename)
+            else:
+                self.update(filename)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_asset_index(assets_dir):
+    # One index per assets folder, shared by the asset manager, the downloader and the layout preview
+    with _indexes_lock:
+        index = _indexes.get(assets_dir)
+        if index is None:
+            index = _indexes[assets_dir] = AssetIndex(assets_dir)
+        return index
@@ -1,111 +1,399 @@
+import io
 import os
 import mss
+import json
+import time
 import requests
+import threading
 import win32gui
 import win32con
 from PIL import Image
+from concurrent.futures import Future
+from requests.adapters import HTTPAdapter
+
+# Local imports
+from lib.constants import IgdbDefaults, ImageDefaults
+from lib.response_cache import ResponseCache
+from lib.asset_index import asset_key, get_asset_index
+from lib.downloader import RateLimiter, RetryableError, retry
+from lib.thumbnail_store import get_thumbnail_store
+
+class TokenError(RuntimeError):
+    # The token endpoint rejected the client credentials, retrying won't help
+    pass
+
 
 class AssetManager():
-    def __init__(self, client_id, client_secret, client_info_missing):
+    def __init__(self, client_id, client_secret, client_info_missing, api_url=IgdbDefaults.API_URL, auth_url=IgdbDefaults.AUTH_URL, token_path=None, cache_path=None):
         self.CLIENT_ID = client_id
         self.CLIENT_SECRET = client_secret
         self.client_info_missing = client_info_missing
 
-        self.COMPRESSION = (1024,1024)
+        # The URLs can point to a local stub server for testing
+        self.api_url = api_url
+        self.auth_url = auth_url
+        # Shared by all download workers
+        self.rate_limiter = RateLimiter(IgdbDefaults.REQUESTS_PER_SECOND)
+
+        # One pooled keep-alive session for all requests, sized for the download workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=IgdbDefaults.DOWNLOAD_WORKERS)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # The access token is fetched lazily on the first API request and cached on disk until it expires
+        self.token_path = token_path
+        self.access_token = None
+        self.token_expires = 0
+        self._token_lock = threading.Lock()
+        # A token request in flight, shared by the threads waiting for it
+        self._token_request = None
+        # Rejected credentials, raised again until the next batch of lookups
+        self._token_error = None
+        self.params = {
+            'client_id': self.CLIENT_ID,
+            'client_secret': self.CLIENT_SECRET,
+            'grant_type': 'client_credentials'
+        }
 
         if not self.client_info_missing:
-            self.auth_url = 'https://id.twitch.tv/oauth2/token'
-            self.params = {
-                'client_id': self.CLIENT_ID,
-                'client_secret': self.CLIENT_SECRET,
-                'grant_type': 'client_credentials'
-            }
+            self.load_token()
 
+        # Lookups are cached on disk so repeated refreshes skip titles already searched
+        self.response_cache = None
+        if cache_path:
             try:
-                self.access_token = requests.post(self.auth_url, params=self.params).json()['access_token']
-                self.headers = {
-                    'Client-ID': self.CLIENT_ID,
-                    'Authorization': f'Bearer {self.access_token}'
-                }
+                self.response_cache = ResponseCache(cache_path)
             except Exception as e:
-                print(f"Failed to get access token: {e}")
+                print(f"Failed to open response cache: {e}")
 
-    def search(self, query, save_dir='screenshots'):
+    def load_token(self):
+        if not self.token_path:
+            return
         try:
-            # Try exact match first
-            exact_body = f'''
-                search "{query}";
-                fields name, screenshots;
-                limit 10;
-            '''
-            if not self.client_info_missing:
-                resp = requests.post('https://api.igdb.com/v4/games', headers=self.headers, data=exact_body)
-                games = resp.json()
-
-                if games:
-                    for game in games:
-                        if game.get("name").lower() == query.lower():
-                            name = game.get('name')
-                            screenshot_ids = game.get("screenshots", [])
-                            if screenshot_ids:
-                                self.get_and_download_screenshots(name, screenshot_ids, save_dir)
-                                return True
-
-                    print(f"No exact match for {query}. Creating dummy file.")
-                    self.create_dummy(query, save_dir)
-
-                else:
-                    print(f"No results for {query}. Creating dummy file.")
-                    self.create_dummy(query, save_dir)
+            with open(self.token_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # A token of other client credentials is not reused
+            if data.get('client_id') == self.CLIENT_ID:
+                self.access_token = data['access_token']
+                self.token_expires = data['expires_at']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def save_token(self):
+        if not self.token_path:
+            return
+        tmp_path = f"{self.token_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'client_id': self.CLIENT_ID, 'access_token': self.access_token, 'expires_at': self.token_expires}, f)
+            os.replace(tmp_path, self.token_path)
+        except OSError as e:
+            print(f"Failed to save access token: {e}")
+
+    def invalidate_token(self, token):
+        with self._token_lock:
+            if self.access_token == token:
+                self.access_token = None
+                self.token_expires = 0
+
+    def clear_token_error(self):
+        with self._token_lock:
+            self._token_error = None
+
+    def get_token(self):
+        # One thread requests a new token outside the lock, the others wait for its result
+        with self._token_lock:
+            if self._token_error:
+                raise self._token_error
+            if self.access_token and time.time() < self.token_expires - IgdbDefaults.TOKEN_EXPIRY_MARGIN:
+                return self.access_token
+            request = self._token_request
+            if request is None:
+                request = self._token_request = Future()
+                owner = True
             else:
-                print("IGDB client info missing, creating dummy file.")
-                self.create_dummy(query, save_dir)
+                owner = False
+
+        if not owner:
+            return request.result()
 
+        try:
+            token, expires = self.request_token()
         except Exception as e:
-            print(f"Search query failed: {e}")
+            with self._token_lock:
+                self._token_request = None
+                if isinstance(e, TokenError):
+                    self._token_error = e
+            request.set_exception(e)
+            raise
+
+        with self._token_lock:
+            self.access_token = token
+            self.token_expires = expires
+            self._token_request = None
+        self.save_token()
+        request.set_result(token)
+        return token
 
-    def get_and_download_screenshots(self, game_name, ids, save_dir):
+    def request_token(self):
         try:
-            id_list = ','.join(str(i) for i in ids)
+            resp = self.session.post(self.auth_url, params=self.params, timeout=IgdbDefaults.TIMEOUT)
+        except requests.RequestException as e:
+            raise RetryableError(f"Failed to get access token: {e}") from e
+        self.check_response(resp)
+        if resp.status_code != 200:
+            raise TokenError(f"Failed to get access token (status {resp.status_code}): {resp.text}")
+
+        data = resp.json()
+        return data['access_token'], time.time() + data.get('expires_in', 0)
+
+    @staticmethod
+    def check_response(resp):
+        # Rate limiting and server errors are worth retrying, other errors are not
+        if resp.status_code == 429 or resp.status_code >= 500:
+            raise RetryableError(f"{resp.url} returned {resp.status_code}")
+
+    def post(self, endpoint, body):
+        token = self.get_token()
+        headers = {
+            'Client-ID': self.CLIENT_ID,
+            'Authorization': f'Bearer {token}'
+        }
+        self.rate_limiter.acquire()
+        try:
+            resp = self.session.post(f"{self.api_url}/{endpoint}", headers=headers, data=body, timeout=IgdbDefaults.TIMEOUT)
+        except requests.RequestException as e:
+            raise RetryableError(f"Request to {endpoint} failed: {e}") from e
+        if resp.status_code == 401:
+            # Revoked or expired early, the retry fetches a new token
+            self.invalidate_token(token)
+            raise RetryableError(f"Access token rejected by {endpoint}")
+        self.check_response(resp)
+        return resp
+
+    def search(self, query, save_dir='screenshots'):
+        # Returns True when a screenshot was saved, raises RetryableError when it is worth trying again
+        try:
+            results = self.resolve_titles([query], max_retries=0)
+            if query in results:
+                return self.save_result(query, results[query], save_dir)
+        except RetryableError:
+            raise
+        except Exception as e:
+            print(f"Search query failed: {e}")
+        return False
+
+    @staticmethod
+    def build_multiquery(queries):
+        # One games search per query, named by position so the results can be matched back
+        parts = []
+        for i, query in enumerate(queries):
+            escaped = query.replace('\\', '\\\\').replace('"', '\\"')
+            parts.append(f'''
+                query games "{i}" {{
+                    search "{escaped}";
+                    fields name, screenshots;
+                    limit 10;
+                }};
+            ''')
+        return "".join(parts)
+
+    @staticmethod
+    def match_games(queries, response):
+        # Exact, case insensitive name match with screenshots for each query, None when there is none
+        results = {query: None for query in queries}
+        for entry in response:
+            try:
+                query = queries[int(entry['name'])]
+            except (KeyError, ValueError, IndexError):
+                continue
+            for game in entry.get('result', []):
+                if game.get('name', '').lower() == query.lower() and game.get('screenshots'):
+                    results[query] = game
+                    break
+        return results
+
+    @staticmethod
+    def screenshot_url(url):
+        url = url.replace('t_thumb', 't_1080p')
+        if url.startswith('//'):
+            url = "https:" + url
+        return url
+
+    def search_games(self, queries):
+        # Up to MULTIQUERY_SIZE title searches in a single request
+        resp = self.post('multiquery', self.build_multiquery(queries))
+        if resp.status_code != 200:
+            raise RuntimeError(f"Multiquery failed (status {resp.status_code}): {resp.text}")
+        return self.match_games(queries, resp.json())
+
+    def get_screenshot_urls(self, screenshot_ids):
+        # Resolves the ids of all matched games at once, split only at the IGDB result limit
+        urls = {}
+        screenshot_ids = sorted(set(screenshot_ids))
+        for i in range(0, len(screenshot_ids), IgdbDefaults.MAX_QUERY_RESULTS):
+            chunk = screenshot_ids[i:i + IgdbDefaults.MAX_QUERY_RESULTS]
             body = f'''
                 fields url;
-                where id = ({id_list});
+                where id = ({','.join(str(screenshot_id) for screenshot_id in chunk)});
+                limit {len(chunk)};
             '''
-            resp = requests.post('https://api.igdb.com/v4/screenshots', headers=self.headers, data=body)
-            if resp.status_code == 200:
-                urls = resp.json()
-                for i, shot in enumerate(urls):
-                    url = "https:" + shot['url'].replace('t_thumb', 't_1080p')
-                    game_name = game_name.replace(' ', '_').replace(':', '')
-                    filename = f"{game_name}.jpg"
-                    self.download_image(url, save_dir, filename)
-                    return True
+            resp = self.post('screenshots', body)
+            if resp.status_code != 200:
+                raise RuntimeError(f"Failed to fetch screenshots (status {resp.status_code}): {resp.text}")
+            for shot in resp.json():
+                urls[shot['id']] = self.screenshot_url(shot['url'])
+        return urls
+
+    def cache_get(self, key):
+        if not self.response_cache:
+            return False, None
+        try:
+            return self.response_cache.get(key)
+        except Exception as e:
+            print(f"Response cache lookup failed: {e}")
+            return False, None
+
+    def cache_put(self, key, value, ttl=IgdbDefaults.SEARCH_TTL):
+        # A None value is stored as a negative entry with its own retry time
+        if not self.response_cache:
+            return
+        try:
+            if value is None:
+                self.response_cache.put_negative(key, IgdbDefaults.NEGATIVE_TTL)
             else:
-                print("Failed to fetch screenshots:", resp.status_code, resp.text)
-                return False
+                self.response_cache.put(key, value, ttl)
         except Exception as e:
-            print(f"get_and_download failed: {e}")
+            print(f"Response cache update failed: {e}")
+
+    def resolve_titles(self, queries, max_retries=IgdbDefaults.MAX_RETRIES):
+        # Returns {query: (game name, screenshot url) or None when IGDB has no exact match}.
+        # Titles are searched in multiquery batches and the first screenshot of every match is resolved
+        # in one query, both only for lookups missing from the response cache.
+        # Titles of a batch that failed are left out of the result.
+        if self.client_info_missing:
+            print("IGDB client info missing, skipping image search.")
+            return {}
+        # Credentials rejected by an earlier batch are tried again once
+        self.clear_token_error()
+
+        games = {}
+        uncached = []
+        for query in queries:
+            hit, game = self.cache_get(f"games:{asset_key(query)}")
+            if hit:
+                games[query] = game
+            else:
+                uncached.append(query)
+
+        for i in range(0, len(uncached), IgdbDefaults.MULTIQUERY_SIZE):
+            batch = uncached[i:i + IgdbDefaults.MULTIQUERY_SIZE]
+            try:
+                found = retry(self.search_games, batch, max_retries=max_retries)
+            except RetryableError:
+                if len(queries) == 1:
+                    raise
+                print(f"Giving up on searching {', '.join(batch)}")
+                continue
+            except TokenError as e:
+                # Every other batch would fail the same way
+                print(f"Image search stopped: {e}")
+                break
+            except Exception as e:
+                print(f"Search for {', '.join(batch)} failed: {e}")
+                continue
+            for query, game in found.items():
+                self.cache_put(f"games:{asset_key(query)}", game and {'name': game['name'], 'screenshots': game['screenshots'][:1]})
+            games.update(found)
+
+        first_screenshots = {query: game['screenshots'][0] for query, game in games.items() if game}
+        urls = {}
+        for screenshot_id in set(first_screenshots.values()):
+            hit, url = self.cache_get(f"screenshot:{screenshot_id}")
+            if hit and url:
+                urls[screenshot_id] = url
+        missing_ids = [screenshot_id for screenshot_id in first_screenshots.values() if screenshot_id not in urls]
+        if missing_ids:
+            found = retry(self.get_screenshot_urls, missing_ids, max_retries=max_retries)
+            for screenshot_id, url in found.items():
+                self.cache_put(f"screenshot:{screenshot_id}", url)
+            urls.update(found)
+
+        results = {}
+        for query, game in games.items():
+            url = urls.get(first_screenshots.get(query))
+            results[query] = (game['name'], url) if url else None
+        return results
+
+    def save_result(self, query, match, save_dir):
+        # Downloads the resolved screenshot. A miss is only remembered in the response cache.
+        if match is None:
+            print(f"No exact match for {query}, searching again after it expires.")
+            return False
+
+        name, url = match
+        filename = f"{name.replace(' ', '_').replace(':', '')}.jpg"
+        return self.download_image(url, save_dir, filename)
 
     def download_image(self, url, folder, filename):
+        # Streams the response into memory and writes only the finished thumbnails, atomically
         try:
             os.makedirs(folder, exist_ok=True)
             path = os.path.join(folder, filename)
 
-            r = requests.get(url, stream=True)
+            try:
+                r = self.session.get(url, stream=True, timeout=IgdbDefaults.TIMEOUT)
+            except requests.RequestException as e:
+                raise RetryableError(f"Downloading {url} failed: {e}") from e
+            self.check_response(r)
             if r.status_code == 200:
-                with open(path, 'wb') as f:
-                    for chunk in r.iter_content(1024):
-                        f.write(chunk)
+                buffer = self.read_response(r, url)
+                if buffer is None:
+                    return False
                 try:
-                    img = Image.open(path)
-                    img.thumbnail(self.COMPRESSION)
-                    img.save(path)
+                    img = Image.open(buffer)
+                    # JPEGs are decoded at the smallest scale that still covers the stored size
+                    level = ImageDefaults.MIPMAP_LEVELS[-1]
+                    scale = min(level / img.width, level / img.height, 1)
+                    img.draft('RGB', (int(img.width * scale), int(img.height * scale)))
+                    img.load()
+                    entry = self.save_image(img, path)
+
+                    received = buffer.getbuffer().nbytes
+                    decoded = img.width * img.height * len(img.getbands())
+                    print(f"Saved {filename}: {received} bytes downloaded, "
+                          f"peak {received + decoded} bytes in memory, {entry['bytes_written']} bytes written")
+                    return True
                 except Exception as e:
                     print(f"Failed to compress {path}: {e}")
             else:
                 print(f"Failed to download {url} (status {r.status_code})")
+        except RetryableError:
+            raise
+        except requests.RequestException as e:
+            raise RetryableError(f"Downloading {url} failed: {e}") from e
         except Exception as e:
             print(f"Downloading image failed: {e}")
+        return False
+
+    @staticmethod
+    def read_response(r, url):
+        # Reads the body into memory in large chunks, None when it exceeds MAX_RESPONSE_BYTES
+        with r:
+            length = int(r.headers.get('Content-Length') or 0)
+            if length > IgdbDefaults.MAX_RESPONSE_BYTES:
+                print(f"Skipping {url}, response of {length} bytes is too large")
+                return None
+
+            buffer = io.BytesIO()
+            for chunk in r.iter_content(IgdbDefaults.DOWNLOAD_CHUNK_SIZE):
+                buffer.write(chunk)
+                if buffer.tell() > IgdbDefaults.MAX_RESPONSE_BYTES:
+                    print(f"Skipping {url}, response exceeds {IgdbDefaults.MAX_RESPONSE_BYTES} bytes")
+                    return None
+        buffer.seek(0)
+        return buffer
 
     def bring_to_front(self, hwnd):
         win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
@@ -121,19 +409,14 @@ class AssetManager():
             bbox = self.get_window_rect(hwnd)
             sct_img = sct.grab(bbox)
             img = Image.frombytes("RGB", sct_img.size, sct_img.rgb)
-            img.thumbnail(self.COMPRESSION)
-            img.save(save_path)
+            self.save_image(img, save_path)
 
-    def create_dummy(self, query, save_dir):
-        try:
-            name = query.replace(' ', '_').replace(':', '')
-            filename = f"{name}.jpg"
-            path = os.path.join(save_dir, filename)
-            shade = 100
-            image = Image.new('RGB', (1,1), (shade,shade,shade))
-            image.save(path)
-        except Exception as e:
-            print(f"Failed to create dummy image: {e}")
+    def save_image(self, img, path):
+        # Saves the asset bounded by the largest thumbnail level together with its smaller variants
+        folder = os.path.dirname(path)
+        entry = get_thumbnail_store(folder).store(img, path)
+        get_asset_index(folder).update(os.path.basename(path))
+        return entry
 
 
 if __name__ == "__main__":
@@ -2,24 +2,35 @@ import re
 import os
 import ast
 import json
+import threading
 import win32gui
 import win32con
 import configparser
-import pygetwindow as gw
+from collections import OrderedDict
 
 # Local imports
-from lib.utils import clean_window_title
-from lib.constants import LayoutDefaults
+from lib.utils import WindowRule, clean_window_title
+from lib.window_manager import WindowSnapshot
+from lib.constants import LayoutDefaults, ReapplyDefaults
 
 class ConfigManager:
     LAYOUT_CONFIG_FILE = "layout_config.ini"
     SECTION = "Layouts"
+    CONFIG_CACHE_SIZE = 256
     
     def __init__(self, base_path):
         self.base_path = base_path
         self.config_dir = os.path.join(base_path, "configs")
         self.settings_file = os.path.join(base_path, "settings.json")
 
+        # Parsed config cache, keyed by path and invalidated by mtime and size
+        self._config_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        self.section_index = SectionIndex(self.config_dir)
+
         # Create config directory if it doesn't exist
         if not os.path.exists(self.config_dir):
             os.makedirs(self.config_dir)
@@ -65,27 +76,91 @@ class ConfigManager:
             return ConfigManager.deserialize(config)
     
 
+    @staticmethod
+    def is_config_file(filename):
+        return filename.startswith("config_") and filename.endswith(".ini")
+
+    @staticmethod
+    def config_name(filename):
+        return filename[7:-4]
+
     def list_config_files(self):
         # List all configuration files and their names
-        config_files = [f for f in os.listdir(self.config_dir) 
-                       if f.startswith("config_") and f.endswith(".ini")]
+        config_files = [f for f in os.listdir(self.config_dir) if self.is_config_file(f)]
         config_files.sort()
-        config_names = [f[7:-4] for f in config_files]
+        config_names = [self.config_name(f) for f in config_files]
         return config_files, config_names
 
-    def load_config(self, config_path):
-        # Load a configuration file
-        config = configparser.ConfigParser()
+    def load_rules(self, config_path):
+        # Load, validate and compile a configuration file
+        entry = self._load_cached(config_path)
+        return entry[1] if entry else None
+
+    def _load_cached(self, config_path):
+        full_path = os.path.join(self.config_dir, config_path)
         try:
-            full_path = os.path.join(self.config_dir, config_path)
-            if os.path.exists(full_path):
-                config.read(full_path)
-                return config
+            stat = os.stat(full_path)
+        except OSError:
+            self.invalidate_config(config_path)
             return None
+
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._cache_lock:
+            entry = self._config_cache.get(full_path)
+            if entry and entry[0] == key:
+                self._config_cache.move_to_end(full_path)
+                self.cache_hits += 1
+                return entry
+            self.cache_misses += 1
+
+        try:
+            config = configparser.ConfigParser()
+            config.read(full_path)
+            validated_config = self.validate_and_repair_config(config)
+            entry = (key, self.compile_config(validated_config))
         except Exception as e:
             print(f"Error loading config file {config_path}: {e}")
             return None
 
+        with self._cache_lock:
+            self._config_cache[full_path] = entry
+            self._config_cache.move_to_end(full_path)
+            while len(self._config_cache) > self.CONFIG_CACHE_SIZE:
+                self._config_cache.popitem(last=False)
+        return entry
+
+    def invalidate_config(self, config_path):
+        with self._cache_lock:
+            self._config_cache.pop(os.path.join(self.config_dir, config_path), None)
+
+    def cache_stats(self):
+        with self._cache_lock:
+            return {'hits': self.cache_hits, 'misses': self.cache_misses, 'entries': len(self._config_cache)}
+
+    @staticmethod
+    def compile_config(config):
+        # Convert a validated config into immutable rules so hot paths never re-parse strings
+        if not config:
+            return ()
+
+        def parse_pair(value):
+            return tuple(map(int, value.split(','))) if value else None
+
+        rules = []
+        for section in config.sections():
+            items = config[section]
+            rules.append(WindowRule(
+                section=section,
+                matcher=clean_window_title(section, sanitize=True),
+                search_title=items.get('search_title') or section,
+                position=parse_pair(items.get('position')),
+                size=parse_pair(items.get('size')),
+                always_on_top=items.getboolean('always_on_top', fallback=False),
+                has_titlebar=items.getboolean('titlebar', fallback=True),
+                tolerance=items.getint('tolerance', fallback=ReapplyDefaults.GEOMETRY_TOLERANCE)
+            ))
+        return tuple(rules)
+
     def load_settings(self):
         # Load application settings
         defaults = False, False, 0
@@ -112,40 +187,16 @@ class ConfigManager:
             print(f"Error saving settings: {e}")
             return False
 
-    def detect_default_config(self):
+    def detect_default_config(self, snapshot=None):
         # Detect and return the best default configuration
-        # Prioritizes configs with a window set to AOT and fall back to match on the most number of matching windows
+        # Ranks configs by matched AOT windows, then by how many of their windows are open
         config_files, config_names = self.list_config_files()
-        highest_matching_windows = [None, 0]
-
-        all_titles = gw.getAllTitles()
-        cleaned_titles = []
-        for title in all_titles:
-            cleaned_titles.append(clean_window_title(title, sanitize=True))
-        
-        for config_file in config_files:
-            matching_windows = 0
-            config = self.load_config(config_file)
-            if not config:
-                continue
-
-            for section in config.sections():
-                if config[section].getboolean("always_on_top", fallback=False):
-                    cleaned_section = clean_window_title(section, sanitize=True)
-
-                    for title in cleaned_titles:
-                        if cleaned_section in title:
-                            return config_names[config_files.index(config_file)]
-                else:
-                    if section in cleaned_titles:
-                        matching_windows += 1
-            
-            if matching_windows > highest_matching_windows[1]:
-                highest_matching_windows[0] = config_names[config_files.index(config_file)]
-                highest_matching_windows[1] = matching_windows
 
-        if highest_matching_windows[0]:
-            return highest_matching_windows[0]
+        snapshot = snapshot or WindowSnapshot()
+        self.section_index.refresh(config_files, self.load_rules)
+        best_config = self.section_index.best_match(snapshot)
+        if best_config:
+            return self.config_name(best_config)
 
         return config_names[0] if config_names else None
 
@@ -198,6 +249,7 @@ class ConfigManager:
                 validated_config.write(config)
                 config.flush()
                 os.fsync(config.fileno())                
+            self.invalidate_config(config_path)
 
             print("Config saved successfully")
             return True
@@ -208,17 +260,23 @@ class ConfigManager:
             traceback.print_exc()
             return False
 
-    def collect_window_settings(self, window_title):
+    def collect_window_settings(self, window_title, snapshot=None):
         # Get settings for a window
         try:
-            window = gw.getWindowsWithTitle(window_title)[0]
+            snapshot = snapshot or WindowSnapshot()
+            window = snapshot.by_title.get(window_title)
+            if window is None:
+                print(f"Skipped {window_title}, the window is no longer open")
+                return None
+            hwnd = window.hwnd
+            rect = win32gui.GetWindowRect(hwnd)
             # Get the current window state
-            has_titlebar = bool(win32gui.GetWindowLong(window._hWnd, win32con.GWL_STYLE) 
+            has_titlebar = bool(win32gui.GetWindowLong(hwnd, win32con.GWL_STYLE) 
                           & win32con.WS_CAPTION)
-            is_topmost = (window._hWnd == win32gui.GetForegroundWindow())
+            is_topmost = (hwnd == win32gui.GetForegroundWindow())
             return {
-                'position': f'{window.left},{window.top}',
-                'size': f'{window.width},{window.height}',
+                'position': f'{rect[0]},{rect[1]}',
+                'size': f'{rect[2] - rect[0]},{rect[3] - rect[1]}',
                 'always_on_top': str(is_topmost).lower(),
                 'titlebar': str(has_titlebar).lower(),
                 'original_title': window_title,
@@ -233,6 +291,7 @@ class ConfigManager:
             path = os.path.join(self.config_dir, f"config_{name}.ini")
             if os.path.exists(path):
                 os.remove(path)
+                self.invalidate_config(path)
                 return True
         except Exception as e:
             print(f"Failed to delete config '{name}': {e}")
@@ -256,6 +315,8 @@ class ConfigManager:
                     valid_items[key] = value.lower() if value.lower() in ("true", "false") else "false"
                 elif key == "titlebar":
                     valid_items[key] = value.lower() if value.lower() in ("true", "false") else "true"
+                elif key == "tolerance":
+                    valid_items[key] = value if re.match(r"^\d+$", value) else str(ReapplyDefaults.GEOMETRY_TOLERANCE)
                 elif value is not None and value.strip():
                     valid_items[key] = value.strip()
             
@@ -266,3 +327,100 @@ class ConfigManager:
             
         return repaired_config
 
+
+class SectionIndex:
+    # Inverted index from cleaned section titles to the configs that contain them.
+    # Persisted next to the configs and only re-read for files whose mtime or size changed.
+    INDEX_FILE = ".section_index.json"
+    VERSION = 1
+
+    def __init__(self, config_dir):
+        self.path = os.path.join(config_dir, self.INDEX_FILE)
+        self.config_dir = config_dir
+        self.files = {}
+        self.sections = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == self.VERSION:
+                    self.files = data.get('files', {})
+        except Exception as e:
+            print(f"Error loading section index, rebuilding: {e}")
+            self.files = {}
+        self._rebuild_sections()
+
+    def _save(self):
+        try:
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.VERSION, 'files': self.files}, f)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            print(f"Error saving section index: {e}")
+
+    def _rebuild_sections(self):
+        sections = {}
+        for config_file, entry in self.files.items():
+            for matcher, always_on_top in entry['sections']:
+                sections.setdefault(matcher, {})[config_file] = always_on_top
+        self.sections = sections
+
+    def refresh(self, config_files, load_rules):
+        # Re-index only new or changed files and drop deleted ones
+        with self._lock:
+            changed = False
+            for config_file in set(self.files) - set(config_files):
+                del self.files[config_file]
+                changed = True
+
+            for config_file in config_files:
+                try:
+                    stat = os.stat(os.path.join(self.config_dir, config_file))
+                except OSError:
+                    continue
+                entry = self.files.get(config_file)
+                if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                    continue
+
+                rules = load_rules(config_file) or ()
+                self.files[config_file] = {
+                    'mtime_ns': stat.st_mtime_ns,
+                    'size': stat.st_size,
+                    'sections': [[rule.matcher, rule.always_on_top] for rule in rules]
+                }
+                changed = True
+
+            if changed:
+                self._rebuild_sections()
+                self._save()
+
+    def best_match(self, snapshot):
+        # Exact title matches are dictionary hits in one pass over the windows,
+        # the remaining sections fall back to the snapshot's substring matcher
+        with self._lock:
+            matched = set()
+            for window in snapshot.windows:
+                if window.cleaned_title in self.sections:
+                    matched.add(window.cleaned_title)
+            for matcher in self.sections.keys() - matched:
+                if snapshot.find_matcher(matcher):
+                    matched.add(matcher)
+
+            scores = {}
+            for matcher in matched:
+                for config_file, always_on_top in self.sections[matcher].items():
+                    score = scores.setdefault(config_file, [0, 0])
+                    score[0] += 1 if always_on_top else 0
+                    score[1] += 1
+
+            ranked = []
+            for config_file, (aot_matches, window_matches) in scores.items():
+                coverage = window_matches / max(1, len(self.files[config_file]['sections']))
+                ranked.append((-aot_matches, -coverage, -window_matches, config_file))
+
+        return min(ranked)[3] if ranked else None
@@ -88,6 +88,12 @@ class UIConstants:
     TASKBAR_HEIGHT = 48
     MAX_WINDOWS = 4
     WINDOW_TITLE_MAX_LENGTH = 24
+
+    # Redraw scheduling
+    FRAME_BUDGET_MS = 16  # Coalesced layout redraws run at most once per frame
+    CONFIG_SELECT_BUDGET_MS = 150  # Scrolling through configs loads at most one per budget
+    DISPATCH_BUDGET_MS = 8  # Time per frame spent on updates posted by background threads
+    DISPATCH_QUEUE_SIZE = 1000  # Pending updates before background threads have to wait
     
     # UI element sizes
     MARGIN = (2,2,2,2)  # (top, right, bottom, left)
@@ -103,6 +109,50 @@ class UIConstants:
     DEFAULT_ALIGN = 'center'  # Valid values: 'left', 'center', 'right'
     DEFAULT_DIRECTION = 'column'  # Valid values: 'row', 'column'
 
+class ReapplyDefaults:
+    # Auto re-apply
+    EVENT_COALESCE_MS = 16  # Window events within one frame are handled together
+    POLL_INTERVAL_MS = 500  # Used only when the window event hooks are unavailable
+    GEOMETRY_TOLERANCE = 2  # Pixels, can be overridden per window with 'tolerance' in the config
+    MAX_REAPPLY_ATTEMPTS = 3  # Failed re-applies before a window is reported and left alone
+    STATS_REFRESH_MS = 5000
+
+    # Background window snapshots
+    SNAPSHOT_STALE_MS = 1000  # Older snapshots are still read by GUI callbacks, but a new one is requested
+    SNAPSHOT_MAX_AGE_MS = 250  # Oldest snapshot used for applying a config without a refresh
+
+    # Applying configs
+    APPLY_TIMEOUT_MS = 1000  # Windows not placed within this time are reported and skipped
+    PROBE_TIMEOUT_MS = 100  # Windows not answering a message within this time are not touched from the GUI
+    APPLY_WORKERS = 4  # Windows placed in parallel
+
+class ImageDefaults:
+    # Layout preview images
+    CACHE_BUDGET_BYTES = 64 * 1024 * 1024  # Decoded sources and resized previews combined
+    RESIZE_SETTLE_MS = 150  # High quality redraw once the window stops resizing
+    DECODE_WORKERS = 2  # Background threads decoding and resizing previews
+    MIPMAP_LEVELS = (128, 256, 512, 1024)  # Pre-scaled asset sizes for the layout preview
+    MIPMAP_DIR = "mipmaps"
+
+class IgdbDefaults:
+    # Screenshot downloads
+    API_URL = "https://api.igdb.com/v4"
+    AUTH_URL = "https://id.twitch.tv/oauth2/token"
+    REQUESTS_PER_SECOND = 4  # IGDB API rate limit
+    DOWNLOAD_WORKERS = 4  # IGDB allows up to 8 open requests
+    MAX_RETRIES = 3  # Retries for rate limited, failed or timed out requests
+    RETRY_BACKOFF = 1.0  # Seconds before the first retry, doubled for each further one
+    TIMEOUT = (5, 30)  # Connect and read timeouts in seconds
+    MULTIQUERY_SIZE = 10  # Searches per multiquery request, the IGDB maximum
+    MAX_QUERY_RESULTS = 500  # IGDB result limit per query
+    CACHE_FILE = ".igdb_cache.sqlite"  # Search and screenshot lookups, stored next to the settings
+    SEARCH_TTL = 30 * 24 * 3600  # Seconds a found game or screenshot url is reused
+    NEGATIVE_TTL = 7 * 24 * 3600  # Seconds before a title without a match is searched again
+    DOWNLOAD_CHUNK_SIZE = 256 * 1024  # Bytes read per chunk when downloading a screenshot
+    MAX_RESPONSE_BYTES = 20 * 1024 * 1024  # Larger screenshot downloads are rejected
+    TOKEN_FILE = ".igdb_token.json"  # Cached access token, stored next to the settings
+    TOKEN_EXPIRY_MARGIN = 300  # Seconds before expiry a cached token is refreshed
+
 class Colors:
     # Background colors
     BACKGROUND = "#202020"
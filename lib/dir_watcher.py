@@ -0,0 +1,234 @@
+import os
+import sys
+import time
+import select
+import ctypes
+import struct
+import threading
+
+ADDED = "added"
+REMOVED = "removed"
+MODIFIED = "modified"
+
+class DirectoryWatcher:
+    # Watches a single directory (not recursive) on a background thread.
+    # Changes are debounced per file name and reported as on_change({name: ADDED | REMOVED | MODIFIED})
+    # from the watcher thread. Uses ReadDirectoryChangesW on Windows, inotify on Linux and polling otherwise.
+    def __init__(self, path, on_change, name_filter=None, debounce=0.2, poll_interval=2.0):
+        self.path = path
+        self.on_change = on_change
+        self.name_filter = name_filter
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.backend = None
+
+        self._pending = {}
+        self._last_event = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._stop_handle = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._stop_handle is not None:
+            self._stop_handle()
+        if self._thread:
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    def _run(self):
+        backends = []
+        if sys.platform == "win32":
+            backends.append(("ReadDirectoryChangesW", self._watch_windows))
+        elif sys.platform.startswith("linux"):
+            backends.append(("inotify", self._watch_inotify))
+        backends.append(("polling", self._watch_polling))
+
+        for name, backend in backends:
+            if self._stop.is_set():
+                return
+            self.backend = name
+            try:
+                backend()
+                return
+            except Exception as e:
+                print(f"Directory watcher backend {name} failed for {self.path}: {e}")
+
+    # Event bookkeeping
+    def _record(self, name, action):
+        if not name or (self.name_filter and not self.name_filter(name)):
+            return
+        previous = self._pending.get(name)
+        if previous == ADDED and action == MODIFIED:
+            action = ADDED
+        elif previous == ADDED and action == REMOVED:
+            # Created and removed within the debounce window
+            del self._pending[name]
+            return
+        elif previous == REMOVED and action == ADDED:
+            action = MODIFIED
+        self._pending[name] = action
+        self._last_event = time.monotonic()
+
+    def _flush_if_due(self):
+        if self._pending and time.monotonic() - self._last_event >= self.debounce:
+            changes, self._pending = self._pending, {}
+            try:
+                self.on_change(changes)
+            except Exception as e:
+                print(f"Error handling directory changes for {self.path}: {e}")
+
+    def _wait_timeout(self):
+        # Wait forever while idle, wake up to flush once a burst has settled
+        if not self._pending:
+            return None
+        return max(0.0, self.debounce - (time.monotonic() - self._last_event))
+
+    # Windows backend
+    def _watch_windows(self):
+        import win32con
+        import win32file
+        import win32event
+        import pywintypes
+
+        actions = {1: ADDED, 2: REMOVED, 3: MODIFIED, 4: REMOVED, 5: ADDED}
+        handle = win32file.CreateFile(
+            self.path,
+            0x0001,  # FILE_LIST_DIRECTORY
+            win32con.FILE_SHARE_READ | win32con.FILE_SHARE_WRITE | win32con.FILE_SHARE_DELETE,
+            None,
+            win32con.OPEN_EXISTING,
+            win32con.FILE_FLAG_BACKUP_SEMANTICS | win32con.FILE_FLAG_OVERLAPPED,
+            None
+        )
+        overlapped = pywintypes.OVERLAPPED()
+        overlapped.hEvent = win32event.CreateEvent(None, True, False, None)
+        stop_event = win32event.CreateEvent(None, True, False, None)
+        self._stop_handle = lambda: win32event.SetEvent(stop_event)
+        buffer = win32file.AllocateReadBuffer(64 * 1024)
+        notify_filter = (win32con.FILE_NOTIFY_CHANGE_FILE_NAME |
+                         win32con.FILE_NOTIFY_CHANGE_LAST_WRITE |
+                         win32con.FILE_NOTIFY_CHANGE_SIZE)
+
+        try:
+            while not self._stop.is_set():
+                win32event.ResetEvent(overlapped.hEvent)
+                win32file.ReadDirectoryChangesW(handle, buffer, False, notify_filter, overlapped)
+
+                while True:
+                    timeout = self._wait_timeout()
+                    timeout = win32event.INFINITE if timeout is None else int(timeout * 1000)
+                    result = win32event.WaitForMultipleObjects([overlapped.hEvent, stop_event], False, timeout)
+                    if result == win32event.WAIT_OBJECT_0 + 1:
+                        win32file.CancelIo(handle)
+                        return
+                    if result == win32event.WAIT_TIMEOUT:
+                        self._flush_if_due()
+                        continue
+                    break
+
+                nbytes = win32file.GetOverlappedResult(handle, overlapped, True)
+                if nbytes == 0:
+                    # Buffer overflow, report every file as changed
+                    self._rescan()
+                else:
+                    for action, name in win32file.FILE_NOTIFY_INFORMATION(buffer, nbytes):
+                        self._record(name, actions.get(action, MODIFIED))
+                self._flush_if_due()
+        finally:
+            self._stop_handle = None
+            handle.Close()
+
+    # Linux backend
+    def _watch_inotify(self):
+        IN_MODIFY = 0x002
+        IN_CLOSE_WRITE = 0x008
+        IN_MOVED_FROM = 0x040
+        IN_MOVED_TO = 0x080
+        IN_CREATE = 0x100
+        IN_DELETE = 0x200
+        IN_Q_OVERFLOW = 0x4000
+        IN_NONBLOCK = 0o4000
+        IN_CLOEXEC = 0o2000000
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        stop_read, stop_write = os.pipe()
+        self._stop_handle = lambda: os.write(stop_write, b"x")
+        header = struct.Struct("iIII")
+
+        try:
+            if libc.inotify_add_watch(fd, os.fsencode(self.path), mask) < 0:
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {self.path}")
+
+            while not self._stop.is_set():
+                readable, _, _ = select.select([fd, stop_read], [], [], self._wait_timeout())
+                if stop_read in readable:
+                    return
+                if fd in readable:
+                    try:
+                        data = os.read(fd, 64 * 1024)
+                    except BlockingIOError:
+                        data = b""
+
+                    offset = 0
+                    while offset + header.size <= len(data):
+                        _, event_mask, _, length = header.unpack_from(data, offset)
+                        name = data[offset + header.size:offset + header.size + length].rstrip(b"\0")
+                        offset += header.size + length
+
+                        if event_mask & IN_Q_OVERFLOW:
+                            self._rescan()
+                        elif event_mask & (IN_DELETE | IN_MOVED_FROM):
+                            self._record(os.fsdecode(name), REMOVED)
+                        elif event_mask & (IN_CREATE | IN_MOVED_TO):
+                            self._record(os.fsdecode(name), ADDED)
+                        elif event_mask & (IN_MODIFY | IN_CLOSE_WRITE):
+                            self._record(os.fsdecode(name), MODIFIED)
+                self._flush_if_due()
+        finally:
+            self._stop_handle = None
+            os.close(fd)
+            os.close(stop_read)
+            os.close(stop_write)
+
+    # Fallback backend
+    def _scan(self):
+        entries = {}
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if entry.is_file() and (not self.name_filter or self.name_filter(entry.name)):
+                    stat = entry.stat()
+                    entries[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return entries
+
+    def _rescan(self):
+        for name in self._scan():
+            self._record(name, MODIFIED)
+
+    def _watch_polling(self):
+        known = self._scan()
+        while not self._stop.wait(self.poll_interval):
+            current = self._scan()
+            for name in known.keys() - current.keys():
+                self._record(name, REMOVED)
+            for name, signature in current.items():
+                if name not in known:
+                    self._record(name, ADDED)
+                elif known[name] != signature:
+                    self._record(name, MODIFIED)
+            known = current
+            # Polling already batches changes, report them right away
+            self._last_event = 0
+            self._flush_if_due()
@@ -0,0 +1,90 @@
+import time
+import queue
+import threading
+
+# Local imports
+from lib.constants import UIConstants
+
+class UiDispatcher:
+    # Runs calls posted from background threads on the Tk thread.
+    # A bounded queue is drained by an after() loop that stops each tick once its time budget is used,
+    # so a burst of updates from a long background job cannot stall the event loop.
+    # The loop only runs while calls are queued, post() starts it again, so an idle GUI never wakes up.
+    def __init__(self, max_pending=UIConstants.DISPATCH_QUEUE_SIZE, budget_ms=UIConstants.DISPATCH_BUDGET_MS,
+                 interval_ms=UIConstants.FRAME_BUDGET_MS):
+        self.budget = budget_ms / 1000
+        self.interval_ms = interval_ms
+        self.root = None
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._keyed = {}
+        self._lock = threading.Lock()
+        self._tk_thread = None
+        self._scheduled = False
+
+    def attach(self, root):
+        # Called from the Tk thread, calls posted before this are run on the first tick
+        self.root = root
+        self._tk_thread = threading.get_ident()
+        with self._lock:
+            self._scheduled = True
+        self.root.after(0, self._drain)
+
+    def post(self, func, *args, key=None):
+        # Queues func(*args) for the Tk thread, calls from the Tk thread itself run right away.
+        # A keyed call replaces a pending call with the same key, e.g. progress updates.
+        # Blocks while the queue is full, slowing down the producer instead of growing the backlog.
+        if threading.get_ident() == self._tk_thread:
+            func(*args)
+            return
+
+        if key is not None:
+            with self._lock:
+                pending = key in self._keyed
+                self._keyed[key] = (func, args)
+            if pending:
+                return
+            self._queue.put((key, None, None))
+        else:
+            self._queue.put((None, func, args))
+        self._wake()
+
+    def _wake(self):
+        # Background thread, schedules a drain unless one is already scheduled or running
+        with self._lock:
+            if self._scheduled or self.root is None:
+                return
+            self._scheduled = True
+        try:
+            self.root.after(0, self._drain)
+        except Exception:
+            # The GUI has been closed
+            with self._lock:
+                self._scheduled = False
+
+    def _drain(self):
+        deadline = time.perf_counter() + self.budget
+        while time.perf_counter() < deadline:
+            try:
+                key, func, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if key is not None:
+                with self._lock:
+                    func, args = self._keyed.pop(key)
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"Error in UI update {getattr(func, '__name__', func)}: {e}")
+
+        with self._lock:
+            # Checked under the lock, a call queued after this sees the loop stopped and starts it
+            if self._queue.empty():
+                self._scheduled = False
+                return
+        try:
+            # Budget used up, the rest waits for the next frame
+            self.root.after(self.interval_ms, self._drain)
+        except Exception:
+            # The GUI has been closed
+            pass
@@ -0,0 +1,140 @@
+import time
+import queue
+import random
+import itertools
+import threading
+
+# Local imports
+from lib.constants import IgdbDefaults
+
+class RetryableError(Exception):
+    # Raised for failures that may succeed later, like rate limiting, server errors and timeouts
+    pass
+
+
+def retry(func, *args, max_retries=IgdbDefaults.MAX_RETRIES, backoff=IgdbDefaults.RETRY_BACKOFF, cancelled=None):
+    # Calls func until it does not raise RetryableError, waiting with exponential backoff in between.
+    # The last RetryableError is raised again once the retries are used up or cancelled is set.
+    cancelled = cancelled or threading.Event()
+    for attempt in range(max_retries + 1):
+        try:
+            return func(*args)
+        except RetryableError:
+            if attempt == max_retries:
+                raise
+            # Jitter keeps concurrent callers from retrying in lockstep
+            if cancelled.wait(backoff * 2 ** attempt * random.uniform(1, 1.5)):
+                raise
+
+
+class RateLimiter:
+    # Spaces calls evenly so no more than rate calls start per second, shared by all threads
+    def __init__(self, rate=IgdbDefaults.REQUESTS_PER_SECOND):
+        self.interval = 1 / rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class DownloadScheduler:
+    # Runs fetch(title) for queued titles on a bounded pool of worker threads.
+    # fetch returns a true value when the title was downloaded and a false one when it failed for good,
+    # raising RetryableError is retried with exponential backoff. Prioritized titles jump the queue.
+    # on_progress(done, failed, total, title) is called from the worker threads after each title.
+    HIGH = 0
+    NORMAL = 1
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, fetch, workers=IgdbDefaults.DOWNLOAD_WORKERS, max_retries=IgdbDefaults.MAX_RETRIES,
+                 backoff=IgdbDefaults.RETRY_BACKOFF, on_progress=None):
+        self.fetch = fetch
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.on_progress = on_progress
+
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._states = {}
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+
+    def submit(self, titles, priority=NORMAL):
+        with self._lock:
+            for title in titles:
+                if title in self._states:
+                    continue
+                self._states[title] = self.QUEUED
+                self.total += 1
+                self._queue.put((priority, next(self._sequence), title))
+
+    def prioritize(self, titles):
+        # Queues the titles again at high priority, the original entries are skipped when reached
+        with self._lock:
+            for title in titles:
+                if self._states.get(title) == self.QUEUED:
+                    self._queue.put((self.HIGH, next(self._sequence), title))
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self):
+        # Blocks until every queued title is done, failed or the scheduler is cancelled
+        threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.done, self.failed
+
+    def _worker(self):
+        while not self._cancelled.is_set():
+            try:
+                _, _, title = self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+            with self._lock:
+                if self._states.get(title) != self.QUEUED:
+                    continue
+                self._states[title] = self.RUNNING
+
+            succeeded = self._fetch_with_retry(title)
+            with self._lock:
+                self._states[title] = self.DONE if succeeded else self.FAILED
+                if succeeded:
+                    self.done += 1
+                else:
+                    self.failed += 1
+                progress = (self.done, self.failed, self.total, title)
+
+            if self.on_progress:
+                try:
+                    self.on_progress(*progress)
+                except Exception as e:
+                    print(f"Error reporting download progress: {e}")
+
+    def _fetch_with_retry(self, title):
+        try:
+            return bool(retry(self.fetch, title, max_retries=self.max_retries, backoff=self.backoff,
+                              cancelled=self._cancelled))
+        except RetryableError as e:
+            print(f"Giving up on {title}: {e}")
+        except Exception as e:
+            print(f"Download for {title} failed: {e}")
+        return False
@@ -0,0 +1,238 @@
+import os
+import time
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageTk
+
+# Local imports
+from lib.constants import ImageDefaults, UIConstants
+
+class ImageCache:
+    # Process-wide LRU cache of decoded source images and resized PhotoImages.
+    # Entries are keyed by path and mtime so replaced files are picked up, and the
+    # combined size of both caches is kept under a memory budget.
+    def __init__(self, budget_bytes=ImageDefaults.CACHE_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self._source_bytes = 0
+        self._sources = OrderedDict()
+        self._rendered = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    @staticmethod
+    def _reduce_factor(source_size, size):
+        # Largest power of two that keeps the decoded image at least as big as the target
+        factor = 1
+        while factor < 8 and source_size[0] // (factor * 2) >= size[0] and source_size[1] // (factor * 2) >= size[1]:
+            factor *= 2
+        return factor
+
+    def get_source(self, path, mtime=None, size=None):
+        # Decodes the image, reduced towards size when given. Safe to call from worker threads.
+        # JPEGs are decoded at reduced scale with draft(), other formats are shrunk with reduce().
+        mtime = mtime or self._stamp(path)
+        if mtime is None:
+            return None
+
+        try:
+            image = Image.open(path)
+            factor = self._reduce_factor(image.size, size) if size else 1
+            key = (path, mtime, factor)
+            with self._lock:
+                entry = self._sources.get(key)
+                if entry:
+                    self._sources.move_to_end(key)
+                    image.close()
+                    return entry[0]
+
+            if factor > 1 and image.format == "JPEG":
+                image.draft("RGB", (image.width // factor, image.height // factor))
+            image.load()
+            # Whatever draft() did not cover is done with reduce()
+            remaining = self._reduce_factor(image.size, size) if size else 1
+            if remaining > 1:
+                image = image.reduce(remaining)
+        except Exception as e:
+            print(f"Error loading image {path}: {e}")
+            return None
+
+        cost = image.width * image.height * len(image.getbands())
+        with self._lock:
+            # Another worker may have decoded the same image meanwhile, its entry is kept
+            entry = self._sources.get(key)
+            if entry:
+                self._sources.move_to_end(key)
+                return entry[0]
+            self._sources[key] = (image, cost)
+            self.used_bytes += cost
+            self._source_bytes += cost
+            # Worker thread, PhotoImages are only released on the Tk thread
+            self._evict(rendered=False)
+        return image
+
+    def render(self, path, size, fast=False, mtime=None):
+        # Returns a resized PIL image and its mtime. Safe to call from worker threads.
+        mtime = mtime or self._stamp(path)
+        if mtime is None or size[0] < 1 or size[1] < 1:
+            return None, mtime
+
+        source = self.get_source(path, mtime, size)
+        if source is None:
+            return None, mtime
+
+        if fast:
+            return source.resize(size, Image.BILINEAR, reducing_gap=2.0), mtime
+        return source.resize(size, Image.LANCZOS), mtime
+
+    def lookup_photo(self, path, size, fast=False, mtime=None):
+        # Returns a cached PhotoImage of the given size without decoding anything.
+        # A fast resize is reused until a high quality one is requested for the same size.
+        # A known mtime, e.g. from the asset index, saves the stat call.
+        mtime = mtime or self._stamp(path)
+        key = (path, mtime, size)
+        with self._lock:
+            entry = self._rendered.get(key)
+            if entry and (fast or entry[2]):
+                self._rendered.move_to_end(key)
+                return entry[0]
+        return None
+
+    def store_photo(self, path, mtime, size, image, fast=False):
+        # Wraps a rendered image in a PhotoImage, must be called from the Tk thread
+        photo = ImageTk.PhotoImage(image)
+
+        key = (path, mtime, size)
+        cost = size[0] * size[1] * 4
+        with self._lock:
+            previous = self._rendered.pop(key, None)
+            if previous:
+                self.used_bytes -= previous[1]
+            self._rendered[key] = (photo, cost, not fast)
+            self.used_bytes += cost
+            self._evict()
+        return photo
+
+    def _evict(self, rendered=True):
+        # Resized previews are cheaper to rebuild than decoded sources, drop them first.
+        # Dropping the last reference to a PhotoImage deletes the Tk image, so without rendered (worker
+        # threads) only the sources are trimmed, once they alone exceed the budget.
+        while self.used_bytes > self.budget_bytes:
+            if rendered and self._rendered:
+                _, entry = self._rendered.popitem(last=False)
+            elif self._sources and (rendered or self._source_bytes > self.budget_bytes):
+                _, entry = self._sources.popitem(last=False)
+                self._source_bytes -= entry[1]
+            else:
+                break
+            self.used_bytes -= entry[1]
+
+    def clear(self):
+        # Releases the PhotoImages, must be called from the Tk thread
+        with self._lock:
+            self._sources.clear()
+            self._rendered.clear()
+            self.used_bytes = 0
+            self._source_bytes = 0
+
+image_cache = ImageCache()
+
+
+class ImageLoader:
+    # Decodes and resizes previews on worker threads.
+    # Finished images are queued and handed to on_loaded(key, photo) on the Tk thread by an after() loop.
+    # Only the latest request per key is kept, older or cancelled ones are dropped unseen.
+    def __init__(self, widget, on_loaded, cache=image_cache, workers=ImageDefaults.DECODE_WORKERS):
+        self.widget = widget
+        self.on_loaded = on_loaded
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-decode")
+        self._results = queue.Queue()
+        self._pending = {}
+        self._drain_job = None
+
+    def request(self, key, path, size, fast=False, mtime=None):
+        # Returns the PhotoImage right away when it is cached, otherwise queues a decode and returns None
+        photo = self.cache.lookup_photo(path, size, fast, mtime)
+        if photo:
+            self.cancel(key)
+            return photo
+
+        request = (path, size, fast, mtime)
+        pending = self._pending.get(key)
+        if pending and pending[0] == request:
+            return None
+
+        self.cancel(key)
+        # Registered before submitting so the worker sees its own request as current
+        self._pending[key] = (request, None)
+        self._pending[key] = (request, self._executor.submit(self._decode, key, request))
+        if not self._drain_job:
+            self._drain_job = self.widget.after(UIConstants.FRAME_BUDGET_MS, self._drain)
+        return None
+
+    def cancel(self, key=None):
+        keys = [key] if key is not None else list(self._pending)
+        for key in keys:
+            pending = self._pending.pop(key, None)
+            if pending and pending[1]:
+                pending[1].cancel()
+
+    def close(self):
+        self.cancel()
+        if self._drain_job:
+            self.widget.after_cancel(self._drain_job)
+            self._drain_job = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _is_current(self, key, request):
+        pending = self._pending.get(key)
+        return pending is not None and pending[0] is request
+
+    def _decode(self, key, request):
+        # Worker thread
+        if not self._is_current(key, request):
+            return
+        path, size, fast, mtime = request
+        try:
+            image, mtime = self.cache.render(path, size, fast, mtime)
+        except Exception as e:
+            print(f"Error resizing image {path}: {e}")
+            image, mtime = None, None
+        self._results.put((key, request, image, mtime))
+
+    def _drain(self):
+        # Tk thread, converts finished images until the frame budget is used up
+        self._drain_job = None
+        deadline = time.perf_counter() + UIConstants.FRAME_BUDGET_MS / 1000
+        while time.perf_counter() < deadline:
+            try:
+                key, request, image, mtime = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if not self._is_current(key, request):
+                continue
+            del self._pending[key]
+
+            path, size, fast, _ = request
+            photo = None
+            if image is not None:
+                try:
+                    photo = self.cache.store_photo(path, mtime, size, image, fast)
+                except Exception as e:
+                    print(f"Error creating preview for {path}: {e}")
+            try:
+                self.on_loaded(key, photo)
+            except Exception as e:
+                print(f"Error showing preview for {path}: {e}")
+
+        if self._pending or not self._results.empty():
+            self._drain_job = self.widget.after(UIConstants.FRAME_BUDGET_MS, self._drain)
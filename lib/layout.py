@@ -1,16 +1,19 @@
-import os
+import time
 import pywinstyles
 import tkinter as tk
 from typing import List
 from ctypes import windll
 from fractions import Fraction
-from PIL import Image, ImageTk
 from tkinter import ttk, messagebox
 
 # Local imports
+from lib.scheduler import TkScheduler
+from lib.image_cache import ImageLoader
+from lib.asset_index import get_asset_index
+from lib.thumbnail_store import get_thumbnail_store
 from lib.config_manager import ConfigManager
 from lib.utils import WindowInfo, clean_window_title
-from lib.constants import UIConstants, Colors, Messages, WindowStyles, Fonts, LayoutDefaults
+from lib.constants import UIConstants, Colors, Messages, WindowStyles, Fonts, LayoutDefaults, ImageDefaults
 
 class TkGUIManager:
     def __init__(self, root, callbacks=None, compact=False, is_admin=False, use_images=False, snap=0, client_info_missing=True):
@@ -60,6 +63,7 @@ class TkGUIManager:
         self.auto_align_layouts = ConfigManager.load_or_create_layouts()
 
         self.layout_number = 0
+        self.scheduler = TkScheduler(self.root)
 
         self.setup_styles()
         self.create_layout()
@@ -288,6 +292,12 @@ class TkGUIManager:
         self.button_divider_frame.pack(side=tk.TOP, fill=tk.X, expand=True, anchor=tk.CENTER)
         self.auto_apply_checkbutton = ttk.Checkbutton(self.button_divider_frame, text="Auto re-apply", variable=self.reapply, command=self.callbacks.get("auto_reapply"))
         self.auto_apply_checkbutton.pack(side=tk.LEFT, padx=5, pady=5)
+        self.reapply_stats_label = ttk.Label(self.button_divider_frame, text="")
+        self.reapply_stats_label.configure(style='TLabel')
+        self.reapply_stats_label.pack(side=tk.LEFT, padx=5)
+        self.config_cache_label = ttk.Label(self.button_divider_frame, text="")
+        self.config_cache_label.configure(style='TLabel')
+        self.config_cache_label.pack(side=tk.RIGHT, padx=5)
 
         # Second line of buttons
         self.buttons_2_container = ttk.Frame(main_buttons)
@@ -438,11 +448,15 @@ class TkGUIManager:
                 self.combo_box.current(new_index)
                 dummy_event = tk.Event()
                 dummy_event.widget = self.combo_box
-                self.callbacks.get("config_selected")(dummy_event)
+                # Fast scrolling only loads the config the wheel stops on, plus one per budget on the way
+                self.scheduler.schedule("config_selected", self.callbacks.get("config_selected"), dummy_event,
+                                        budget_ms=UIConstants.CONFIG_SELECT_BUDGET_MS)
 
     def set_layout_frame(self, windows): 
-        if self.layout_frame:
-            self.layout_frame.destroy()
+        if self.layout_frame and self.layout_frame.winfo_exists():
+            # Reuse the existing canvas items, only changed windows are redrawn
+            self.layout_frame.set_windows(windows, use_images=self.use_images, assets_dir=self.assets_dir)
+            return
 
         self.layout_frame = ScreenLayoutFrame(self.layout_container, self.res_x, self.res_y, windows, assets_dir=self.assets_dir, use_images=self.use_images)
         self.layout_frame.pack(fill=tk.BOTH, expand=True)
@@ -530,6 +544,13 @@ class TkGUIManager:
             show_config_settings(selected)
 
         def show_config_settings(selected_windows):
+            # Read once per window when the selection is confirmed, windows closed since then are left out
+            window_settings = {title: settings_callback(title) for title in selected_windows}
+            window_settings = {title: values for title, values in window_settings.items() if values}
+            if not window_settings:
+                messagebox.showerror("Error", "The selected windows are no longer open")
+                return
+
             for widget in config_win.winfo_children():
                 widget.destroy()
 
@@ -538,13 +559,13 @@ class TkGUIManager:
             settings_frame.pack(fill='both', expand=True, padx=10, pady=10)
 
             sorted_windows = sorted(
-                selected_windows,
-                key=lambda title: int((settings_callback(title) or {}).get("position", "0,0").split(",")[0])
+                window_settings,
+                key=lambda title: int(window_settings[title].get("position", "0,0").split(",")[0])
             )
 
             settings_vars = {}
             for row, title in enumerate(sorted_windows):
-                values = settings_callback(title) or {}
+                values = window_settings[title]
                 pos_var = tk.StringVar(value=values.get("position", "0,0"))
                 size_var = tk.StringVar(value=values.get("size", "100,100"))
                 aot_var = tk.BooleanVar(value=values.get("always_on_top", "false") == "true")
@@ -650,9 +671,9 @@ class TkGUIManager:
                                                 window_exists,
                                                 search_title=''
                                                 ))
-                    # Remove the old layout before redrawing
-                    if self.layout_frame_create_config:
-                        self.layout_frame_create_config.destroy()                    
+                    if self.layout_frame_create_config and self.layout_frame_create_config.winfo_exists():
+                        self.layout_frame_create_config.set_windows(windows)
+                        return
 
                     self.layout_frame_create_config = ScreenLayoutFrame(layout_container_create_config,
                                                                 self.root.winfo_screenwidth(),
@@ -930,7 +951,7 @@ class TkGUIManager:
 class ScreenLayoutFrame(ttk.Frame):
     def __init__(self, parent, screen_width, screen_height, windows: List[WindowInfo], assets_dir, use_images=False):
         super().__init__(parent)
-        self.windows = windows
+        self.windows = []
         
         self.assets_dir = assets_dir
         self.use_images = use_images
@@ -943,14 +964,131 @@ class ScreenLayoutFrame(ttk.Frame):
         self.screen_width = screen_width
         self.screen_height = screen_height
         self.taskbar_height = UIConstants.TASKBAR_HEIGHT
+        self.tk_images = {}
+        self.scheduler = TkScheduler(self)
+        # Previews are decoded on worker threads, the window rectangle is shown until they arrive
+        self.loader = ImageLoader(self, self.on_image_loaded)
 
-        self.compute_bounds()
+        # Canvas items are created once per window and only moved or updated afterwards
+        self.items = {}
+        self.order = []
+        self._next_tag = 0
+        self.last_draw_ms = 0
+
+        self.screen_item = self.canvas.create_rectangle(0, 0, 0, 0, outline=Colors.WINDOW_BORDER, width=5)
+        self.taskbar_item = self.canvas.create_rectangle(0, 0, 0, 0, fill=Colors.TASKBAR, outline="")
+
+        self.set_windows(windows)
     
     def redraw(self):
         width = self.canvas.winfo_width()
         height = self.canvas.winfo_height()
         self.draw_layout(width, height)
 
+    def set_windows(self, windows: List[WindowInfo], use_images=None, assets_dir=None):
+        # Reuses the items of windows that are still present and only adds, updates or removes the rest
+        if use_images is not None:
+            self.use_images = use_images
+        if assets_dir is not None:
+            self.assets_dir = assets_dir
+
+        self.windows = windows
+        self.compute_bounds()
+
+        keys = []
+        seen = {}
+        for win in windows:
+            count = seen.get(win.name, 0)
+            seen[win.name] = count + 1
+            keys.append(win.name if not count else f"{win.name}#{count}")
+
+        for key in set(self.items) - set(keys):
+            self.canvas.delete(self.items.pop(key)['tag'])
+            self.tk_images.pop(key, None)
+            self.loader.cancel(key)
+
+        for key, win in zip(keys, windows):
+            item = self.items.get(key)
+            if item is None:
+                item = self.create_window_items(key)
+            if item['info'] != win:
+                self.update_window_items(item, win)
+            # Keep the stacking order of the config
+            self.canvas.tag_raise(item['tag'])
+
+        self.order = keys
+        self.redraw()
+
+    def create_window_items(self, key):
+        tag = f"window_{self._next_tag}"
+        self._next_tag += 1
+        item = {
+            'tag': tag,
+            'info': None,
+            'rect': self.canvas.create_rectangle(0, 0, 0, 0, tags=(tag,)),
+            'image': None,
+            'lines': [],
+            'missing': None,
+        }
+        self.items[key] = item
+        return item
+
+    def update_window_items(self, item, win):
+        tag = item['tag']
+        background = Colors.WINDOW_NORMAL if not win.always_on_top else Colors.WINDOW_ALWAYS_ON_TOP
+
+        self.canvas.itemconfigure(item['rect'],
+            fill=Colors.WINDOW_ALWAYS_ON_TOP if win.always_on_top else Colors.WINDOW_NORMAL,
+            outline=Colors.WINDOW_BORDER,
+            width=2 if not win.always_on_top else 3
+        )
+
+        if item['image'] and (not item['info'] or item['info'].search_title != win.search_title):
+            self.canvas.delete(item['image'])
+            item['image'] = None
+
+        # Text
+        for text_background, text, _ in item['lines']:
+            self.canvas.delete(text_background, text)
+        item['lines'] = []
+
+        info_lines = [
+            win.search_title or win.name,
+            f"Pos: {win.pos_x},{win.pos_y}",
+            f"Size: {win.width}x{win.height}",
+            f"AOT: {'Yes' if win.always_on_top else 'No'}"
+        ]
+
+        for i, line in enumerate(info_lines):
+            text_background = self.canvas.create_rectangle(0, 0, 0, 0, fill=background, outline="", tags=(tag,))
+            text = self.canvas.create_text(0, 0,
+                text=line,
+                fill=Colors.TEXT_NORMAL,
+                font=Fonts.TEXT_BOLD if i == 0 else Fonts.TEXT_NORMAL,
+                anchor="nw",
+                justify=tk.LEFT,
+                tags=(tag,)
+            )
+            item['lines'].append((text_background, text, len(line) * 7.2))
+
+        # Missing text
+        if item['missing']:
+            self.canvas.delete(*item['missing'])
+            item['missing'] = None
+        if not win.exists:
+            item['missing'] = (
+                self.canvas.create_rectangle(0, 0, 0, 0, fill=background, outline="", tags=(tag,)),
+                self.canvas.create_text(0, 0,
+                    text="MISSING",
+                    fill=Colors.TEXT_ERROR,
+                    font=Fonts.TEXT_BOLD,
+                    justify=tk.CENTER,
+                    tags=(tag,)
+                )
+            )
+
+        item['info'] = win
+
     def compute_bounds(self):
         if not self.windows:
             self.min_x, self.min_y = 0, 0
@@ -974,12 +1112,70 @@ class ScreenLayoutFrame(ttk.Frame):
         self.max_y = max(ys_end)
 
     def on_resize(self, event):
-        self.draw_layout(event.width, event.height)
+        # Configure events are coalesced to one redraw per frame with a cheap image filter,
+        # followed by a full quality redraw once the size settles
+        self.scheduler.schedule("resize", self.draw_layout, event.width, event.height, True)
+        self.scheduler.debounce("settle", ImageDefaults.RESIZE_SETTLE_MS, self.redraw)
+
+    def destroy(self):
+        self.scheduler.cancel()
+        self.loader.close()
+        super().destroy()
+
+
+    def remove_image(self, key, item):
+        if item['image']:
+            self.canvas.delete(item['image'])
+            item['image'] = None
+        self.tk_images.pop(key, None)
+
+    def show_image(self, key, item, tk_image):
+        x, y = self.canvas.coords(item['rect'])[:2]
+        self.tk_images[key] = tk_image
+        if item['image']:
+            self.canvas.coords(item['image'], x, y)
+            self.canvas.itemconfigure(item['image'], image=tk_image)
+        else:
+            item['image'] = self.canvas.create_image(x, y, image=tk_image, anchor=tk.NW, tags=(item['tag'],))
+            self.canvas.tag_raise(item['image'], item['rect'])
 
-    def draw_layout(self, width, height):
-        self.canvas.delete("all")
+    def on_image_loaded(self, key, tk_image):
+        item = self.items.get(key)
+        if not item or not self.use_images:
+            return
+        if tk_image:
+            self.show_image(key, item, tk_image)
+        else:
+            self.remove_image(key, item)
+
+    def draw_image(self, key, item, x, y, w, h, fast):
+        asset = None
+        if self.use_images and self.assets_dir:
+            asset_index = get_asset_index(self.assets_dir)
+            asset = asset_index.lookup(item['info'].search_title)
+        if not asset:
+            self.loader.cancel(key)
+            self.remove_image(key, item)
+            return
 
+        # The smallest stored variant covering the drawn size leaves only a small final resize.
+        # Variants are rebuilt with the asset, so its mtime versions them as well.
+        size = (int(w), int(h))
+        image_path = get_thumbnail_store(self.assets_dir).nearest(asset_index.path(asset), size)
+        tk_image = self.loader.request(key, image_path, size, fast=fast, mtime=asset.mtime_ns)
+        if tk_image:
+            self.show_image(key, item, tk_image)
+        elif item['image']:
+            # The previous preview stays in place until the new size has been decoded
+            self.canvas.coords(item['image'], x, y)
+
+    def draw_layout(self, width, height, fast=False):
+        # Moves the existing items to fit the canvas size
         padding = 5
+        if width <= padding * 2 or height <= padding * 2:
+            return
+        start = time.perf_counter()
+
         drawable_height = height - padding * 2
         drawable_width = width - padding * 2
 
@@ -1001,125 +1197,56 @@ class ScreenLayoutFrame(ttk.Frame):
         frame_top = y_offset
         frame_right = x_offset + scale * self.screen_width
         frame_bottom = y_offset + scale * self.screen_height
-        frame_width = 5
 
         # Backgound
-        self.canvas.create_rectangle(
-            frame_left, frame_top, frame_right, frame_bottom,
-            outline=Colors.WINDOW_BORDER, width=frame_width
-        )
+        self.canvas.coords(self.screen_item, frame_left, frame_top, frame_right, frame_bottom)
 
         # Taskbar
-        self.canvas.create_rectangle(
+        self.canvas.coords(self.taskbar_item,
             frame_left,
             frame_bottom - UIConstants.TASKBAR_HEIGHT * scale,
             frame_right,
-            frame_bottom,
-            fill=Colors.TASKBAR,
-            outline=""
+            frame_bottom
         )
 
-        # Draw window frames
-        for win in self.windows:
+        # Window frames
+        padding_x = 5
+        padding_y = 5
+        line_height = 16
+        text_height = line_height - 2
+
+        for key in self.order:
+            item = self.items[key]
+            win = item['info']
             x = x_offset + win.pos_x * scale
             y = y_offset + win.pos_y * scale
             w = win.width * scale
             h = win.height * scale
 
-            border_color = Colors.WINDOW_BORDER
-            fill_color = Colors.WINDOW_ALWAYS_ON_TOP if win.always_on_top else Colors.WINDOW_NORMAL
-                
-            # Draw window rectangle
-            self.canvas.create_rectangle(
-                x, y, x + w, y + h,
-                fill=fill_color,
-                outline=border_color,
-                width=2 if not win.always_on_top else 3
-                )
-
-            # Load images
-            if self.use_images:
-                image_paths = [
-                    os.path.join(self.assets_dir, f"{win.search_title.replace(' ', '_').replace(':', '')}.jpg"),
-                    os.path.join(self.assets_dir, f"{win.search_title.replace(' ', '_').replace(':', '')}.png")
-                ]
-                for image_path in image_paths:
-                    if os.path.exists(image_path):
-                        try:
-                            image = Image.open(image_path)
-                            image = image.resize((int(w), int(h)), Image.LANCZOS)
-                            tk_image = ImageTk.PhotoImage(image)
-                            if not hasattr(self, 'tk_images'):
-                                self.tk_images = {}
-                            self.tk_images[win.search_title] = tk_image
-                            self.canvas.create_image(x, y, image=tk_image, anchor=tk.NW)
-                            break
-                        except Exception as e:
-                            print(f"Error loading image: {e}")
-
-            # Draw text
-            info_lines = [
-                win.search_title or win.name,
-                f"Pos: {win.pos_x},{win.pos_y}",
-                f"Size: {win.width}x{win.height}",
-                f"AOT: {'Yes' if win.always_on_top else 'No'}"
-            ]
-
-            text_color = Colors.TEXT_NORMAL
-            padding_x = 5
-            padding_y = 5
-            line_height = 16
+            self.canvas.coords(item['rect'], x, y, x + w, y + h)
+            self.draw_image(key, item, x, y, w, h, fast)
 
+            # Text lines that don't fit the window are hidden
             max_lines = int((h - 2 * padding_y) // line_height)
-            lines_to_draw = info_lines[:max_lines]
-
-            for i, line in enumerate(lines_to_draw):
-                font_to_use = Fonts.TEXT_BOLD if i == 0 else Fonts.TEXT_NORMAL
+            for i, (text_background, text, text_width) in enumerate(item['lines']):
                 text_x = x + padding_x
                 text_y = y + padding_y + i * line_height
-                
-                # Text background
-                text_width = len(line) * 7.2
-                text_height = line_height - 2
-                
-                self.canvas.create_rectangle(
-                    text_x - 2, 
-                    text_y - 2, 
-                    text_x + text_width, 
-                    text_y + text_height, 
-                    fill=Colors.WINDOW_NORMAL if not win.always_on_top else Colors.WINDOW_ALWAYS_ON_TOP, 
-                    outline=""
-                )
-                
-                # Draw the text on top of the background
-                self.canvas.create_text(
-                    text_x,
-                    text_y,
-                    text=line,
-                    fill=text_color,
-                    font=font_to_use,
-                    anchor="nw",
-                    justify=tk.LEFT
-                )
+                state = tk.NORMAL if i < max_lines else tk.HIDDEN
+
+                self.canvas.coords(text_background, text_x - 2, text_y - 2, text_x + text_width, text_y + text_height)
+                self.canvas.coords(text, text_x, text_y)
+                self.canvas.itemconfigure(text_background, state=state)
+                self.canvas.itemconfigure(text, state=state)
 
-            # Missing text
-            if not win.exists:
+            if item['missing']:
                 margin_bottom = 5 * scale
-                
-                self.canvas.create_rectangle(
-                    (x + w / 2) - 26, 
-                    (y + h - margin_bottom) - 12, 
+                missing_background, missing_text = item['missing']
+                self.canvas.coords(missing_background,
+                    (x + w / 2) - 26,
+                    (y + h - margin_bottom) - 12,
                     (x + w / 2) + 28,
-                    (y + h - margin_bottom) - 26,
-                    fill=Colors.WINDOW_NORMAL if not win.always_on_top else Colors.WINDOW_ALWAYS_ON_TOP, 
-                    outline=""
-                )
-                
-                self.canvas.create_text(
-                    x + w / 2,
-                    y + h - margin_bottom - 20,
-                    text="MISSING",
-                    fill=Colors.TEXT_ERROR,
-                    font=Fonts.TEXT_BOLD,
-                    justify=tk.CENTER
+                    (y + h - margin_bottom) - 26
                 )
+                self.canvas.coords(missing_text, x + w / 2, y + h - margin_bottom - 20)
+
+        self.last_draw_ms = (time.perf_counter() - start) * 1000
@@ -0,0 +1,52 @@
+import json
+import time
+import sqlite3
+import threading
+
+class ResponseCache:
+    # Persistent cache of IGDB lookups in SQLite, shared by the download threads.
+    # Every entry expires after its own TTL. Negative entries record a lookup that found nothing,
+    # so a miss is not searched again before its retry time.
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT, negative INTEGER NOT NULL, stored REAL NOT NULL, expires REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM responses WHERE expires <= ?", (time.time(),))
+
+    def get(self, key):
+        # Returns (hit, value), value is None for a negative entry
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, negative FROM responses WHERE key = ? AND expires > ?", (key, time.time())
+            ).fetchone()
+        if row is None:
+            return False, None
+        value, negative = row
+        return True, None if negative else json.loads(value)
+
+    def put(self, key, value, ttl):
+        self._store(key, json.dumps(value), False, ttl)
+
+    def put_negative(self, key, ttl):
+        self._store(key, None, True, ttl)
+
+    def _store(self, key, value, negative, ttl):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, negative, stored, expires) VALUES (?, ?, ?, ?, ?)",
+                (key, value, int(negative), now, now + ttl)
+            )
+
+    def invalidate(self, key):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,52 @@
+import time
+
+# Local imports
+from lib.constants import UIConstants
+
+class TkScheduler:
+    # Coalesces GUI work on top of widget.after().
+    # Only the latest call per key is kept, so a burst of events costs one run per frame budget.
+    def __init__(self, widget, frame_budget_ms=UIConstants.FRAME_BUDGET_MS):
+        self.widget = widget
+        self.frame_budget_ms = frame_budget_ms
+        self._pending = {}
+        self._jobs = {}
+        self._last_run = {}
+
+    def schedule(self, key, func, *args, budget_ms=None):
+        # Throttle: runs right away when idle, otherwise once the budget since the last run has passed
+        self._pending[key] = (func, args)
+        if key in self._jobs:
+            return
+
+        budget_ms = self.frame_budget_ms if budget_ms is None else budget_ms
+        elapsed_ms = (time.monotonic() - self._last_run.get(key, 0)) * 1000
+        delay_ms = max(0, int(budget_ms - elapsed_ms))
+        self._jobs[key] = self.widget.after(delay_ms, self._run, key)
+
+    def debounce(self, key, delay_ms, func, *args):
+        # Runs once no new call for the key has arrived for delay_ms
+        self._pending[key] = (func, args)
+        job = self._jobs.pop(key, None)
+        if job:
+            self.widget.after_cancel(job)
+        self._jobs[key] = self.widget.after(delay_ms, self._run, key)
+
+    def cancel(self, key=None):
+        keys = [key] if key is not None else list(self._jobs)
+        for key in keys:
+            job = self._jobs.pop(key, None)
+            if job:
+                self.widget.after_cancel(job)
+            self._pending.pop(key, None)
+
+    def _run(self, key):
+        self._jobs.pop(key, None)
+        job = self._pending.pop(key, None)
+        self._last_run[key] = time.monotonic()
+        if job:
+            func, args = job
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"Error running scheduled task {key}: {e}")
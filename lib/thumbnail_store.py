@@ -0,0 +1,201 @@
+import os
+import json
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+
+# Local imports
+from lib.constants import ImageDefaults
+
+IMAGE_EXTENSIONS = (".jpg", ".png")
+
+
+def variant_name(filename, level):
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}_{level}{ext}"
+
+
+def save_atomic(image, path):
+    # Writes to a temporary file first so a crash never leaves a half-written image behind.
+    # Returns the number of bytes written.
+    image_format = Image.registered_extensions().get(os.path.splitext(path)[1].lower())
+    tmp_path = f"{path}.tmp"
+    image.save(tmp_path, format=image_format)
+    written = os.path.getsize(tmp_path)
+    os.replace(tmp_path, path)
+    return written
+
+
+def save_variants(image, path, levels=ImageDefaults.MIPMAP_LEVELS, save_base=True):
+    # Saves every level that is still a reduction of the image to the mipmap folder next to path.
+    # With save_base the asset itself is first saved to path bounded by the largest level.
+    # Returns the manifest entry, which includes the number of bytes written.
+    folder, filename = os.path.split(path)
+    mipmap_dir = os.path.join(folder, ImageDefaults.MIPMAP_DIR)
+    os.makedirs(mipmap_dir, exist_ok=True)
+
+    levels = sorted(levels)
+    image = image.copy()
+    written = 0
+    if save_base:
+        image.thumbnail((levels[-1], levels[-1]))
+        written += save_atomic(image, path)
+    size = list(image.size)
+
+    variants = {}
+    # Each level is scaled down from the previous one, largest first
+    for level in reversed(levels):
+        if max(image.size) <= level:
+            continue
+        image.thumbnail((level, level))
+        written += save_atomic(image, os.path.join(mipmap_dir, variant_name(filename, level)))
+        variants[str(level)] = list(image.size)
+
+    return {
+        'mtime_ns': os.stat(path).st_mtime_ns,
+        'size': size,
+        'variants': variants,
+        'bytes_written': written,
+    }
+
+
+def build_variants(path, levels=ImageDefaults.MIPMAP_LEVELS):
+    # Process pool entry point for migrating existing assets, the asset file itself is left untouched
+    try:
+        with Image.open(path) as image:
+            image.load()
+            if image.mode not in ("RGB", "RGBA", "L"):
+                image = image.convert("RGB")
+            return os.path.basename(path), save_variants(image, path, levels, save_base=False)
+    except Exception as e:
+        print(f"Failed to build thumbnails for {path}: {e}")
+        return os.path.basename(path), None
+
+
+class ThumbnailStore:
+    # Pre-scaled copies of each asset in assets/mipmaps, described by a manifest
+    # so the layout preview can pick the smallest variant that still covers the drawn size.
+    MANIFEST_FILE = ".thumbnails.json"
+    VERSION = 1
+
+    def __init__(self, assets_dir, levels=ImageDefaults.MIPMAP_LEVELS):
+        self.assets_dir = assets_dir
+        self.levels = tuple(sorted(levels))
+        self.mipmap_dir = os.path.join(assets_dir, ImageDefaults.MIPMAP_DIR)
+        self.manifest_path = os.path.join(assets_dir, self.MANIFEST_FILE)
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION and data.get('levels') == list(self.levels):
+                self.entries = data.get('entries', {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _save(self):
+        data = {'version': self.VERSION, 'levels': list(self.levels), 'entries': self.entries}
+        tmp_path = f"{self.manifest_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            print(f"Failed to save thumbnail manifest: {e}")
+
+    def store(self, image, path):
+        # Saves a new or replaced asset together with its smaller variants
+        entry = save_variants(image, path, self.levels)
+        with self._lock:
+            self.entries[os.path.basename(path)] = entry
+            self._save()
+        return entry
+
+    def remove(self, filename):
+        with self._lock:
+            entry = self.entries.pop(filename, None)
+            if entry is None:
+                return
+            self._save()
+        for level in entry['variants']:
+            try:
+                os.remove(os.path.join(self.mipmap_dir, variant_name(filename, level)))
+            except OSError:
+                pass
+
+    def refresh(self, path):
+        # Rebuilds the variants of an asset changed outside the asset manager
+        filename = os.path.basename(path)
+        entry = self.entries.get(filename)
+        try:
+            if entry and entry['mtime_ns'] == os.stat(path).st_mtime_ns:
+                return
+        except OSError:
+            return
+        filename, entry = build_variants(path, self.levels)
+        if entry is None:
+            return
+        with self._lock:
+            self.entries[filename] = entry
+            self._save()
+
+    def nearest(self, path, size):
+        # Smallest variant covering size, or the asset itself when none does or the manifest has no entry
+        filename = os.path.basename(path)
+        entry = self.entries.get(filename)
+        if not entry:
+            return path
+        for level in self.levels:
+            dims = entry['variants'].get(str(level))
+            if dims and dims[0] >= size[0] and dims[1] >= size[1]:
+                return os.path.join(self.mipmap_dir, variant_name(filename, level))
+        return path
+
+    def pending(self):
+        # Assets without an up to date manifest entry
+        paths = []
+        try:
+            with os.scandir(self.assets_dir) as it:
+                for entry in it:
+                    if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    known = self.entries.get(entry.name)
+                    if not known or known['mtime_ns'] != entry.stat().st_mtime_ns:
+                        paths.append(entry.path)
+        except OSError as e:
+            print(f"Failed to scan {self.assets_dir}: {e}")
+        return paths
+
+    def migrate(self, paths=None, workers=None):
+        # Builds variants for existing assets on a process pool, returns the number of assets migrated
+        paths = self.pending() if paths is None else paths
+        if not paths:
+            return 0
+
+        migrated = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for filename, entry in executor.map(build_variants, paths, [self.levels] * len(paths)):
+                if entry is None:
+                    continue
+                with self._lock:
+                    self.entries[filename] = entry
+                migrated += 1
+
+        with self._lock:
+            self._save()
+        return migrated
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_thumbnail_store(assets_dir):
+    # One store per assets folder, shared by the asset manager and the layout preview
+    with _stores_lock:
+        store = _stores.get(assets_dir)
+        if store is None:
+            store = _stores[assets_dir] = ThumbnailStore(assets_dir)
+        return store
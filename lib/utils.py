@@ -12,6 +12,18 @@ class WindowInfo:
     exists: bool
     search_title: str
 
+@dataclass(frozen=True, slots=True)
+class WindowRule:
+    # Compiled form of one config section, built once per loaded config
+    section: str
+    matcher: str
+    search_title: str
+    position: tuple[int, int] | None
+    size: tuple[int, int] | None
+    always_on_top: bool
+    has_titlebar: bool
+    tolerance: int
+
 def clean_window_title(title, sanitize=False, titlecase=True):
     if not title:
         return ""
@@ -1,16 +1,168 @@
 import time
+import queue
+import ctypes
+import threading
 import win32gui
 import win32con
-import pygetwindow as gw
+import win32process
+from ctypes import wintypes
+from collections import deque
+from concurrent.futures import Future, wait
+from dataclasses import dataclass, field
 
 # Local imports
 from lib.utils import clean_window_title
+from lib.constants import ReapplyDefaults
+
+_user32 = ctypes.WinDLL("user32", use_last_error=True)
+_user32.BeginDeferWindowPos.argtypes = [ctypes.c_int]
+_user32.BeginDeferWindowPos.restype = wintypes.HANDLE
+_user32.DeferWindowPos.argtypes = [wintypes.HANDLE, wintypes.HWND, wintypes.HWND,
+                                   ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int, wintypes.UINT]
+_user32.DeferWindowPos.restype = wintypes.HANDLE
+_user32.EndDeferWindowPos.argtypes = [wintypes.HANDLE]
+_user32.EndDeferWindowPos.restype = wintypes.BOOL
+_user32.IsHungAppWindow.argtypes = [wintypes.HWND]
+_user32.IsHungAppWindow.restype = wintypes.BOOL
+_user32.SendMessageTimeoutW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM,
+                                        wintypes.UINT, wintypes.UINT, ctypes.POINTER(ctypes.c_size_t)]
+_user32.SendMessageTimeoutW.restype = ctypes.c_ssize_t
+
+SMTO_ABORTIFHUNG = 0x0002
+SMTO_ERRORONEXIT = 0x0020
+
+DWMWA_EXTENDED_FRAME_BOUNDS = 9
+_dwmapi = ctypes.WinDLL("dwmapi")
+_dwmapi.DwmGetWindowAttribute.argtypes = [wintypes.HWND, wintypes.DWORD, ctypes.c_void_p, wintypes.DWORD]
+_dwmapi.DwmGetWindowAttribute.restype = ctypes.c_long
+
+@dataclass(frozen=True)
+class SnapshotWindow:
+    hwnd: int
+    title: str
+    cleaned_title: str
+    class_name: str
+    pid: int
+
+@dataclass(frozen=True)
+class WindowBinding:
+    # Fingerprint of the window a config section was matched to
+    hwnd: int
+    title: str
+    class_name: str
+    pid: int
+
+@dataclass(frozen=True)
+class WindowApplyResult:
+    hwnd: int
+    status: str  # "placed", "unresponsive", "invalid" or "failed"
+    elapsed_ms: float
+
+@dataclass
+class PendingApply:
+    # An apply in progress, from start_apply until finish_apply
+    placements: list
+    start: float
+    workers: int = 1
+    statuses: dict = field(default_factory=dict)  # hwnd: (status, elapsed_ms)
+    rules: dict = field(default_factory=dict)
+    jobs: dict = field(default_factory=dict)  # hwnd: Future of prepare_window
+    restored: list = field(default_factory=list)
+    frame_changed: set = field(default_factory=set)
+    cancelled: threading.Event = field(default_factory=threading.Event)
+
+@dataclass(frozen=True)
+class ApplyResult:
+    windows: tuple  # WindowApplyResult per placement, in config order
+    commit_ms: float  # The DeferWindowPos transaction
+    total_ms: float
+
+    @property
+    def unresponsive(self):
+        return [window.hwnd for window in self.windows if window.status == "unresponsive"]
+
+
+class WindowSnapshot:
+    # One EnumWindows pass over all visible top-level windows.
+    # Every lookup made while matching config sections is answered from the index built here.
+    # The window data never changes after enumeration, only the memo of find_matcher answers is filled in.
+    def __init__(self):
+        self.created = time.monotonic()
+        self.windows = self._enumerate()
+        self.by_hwnd = {window.hwnd: window for window in self.windows}
+        self.by_title = {}
+        self.by_cleaned_title = {}
+        for window in self.windows:
+            self.by_title.setdefault(window.title, window)
+            self.by_cleaned_title.setdefault(window.cleaned_title, window)
+        self._section_matches = {}
+
+    def _enumerate(self):
+        def enum_window_callback(hwnd, windows):
+            try:
+                if win32gui.IsWindowVisible(hwnd):
+                    title = win32gui.GetWindowText(hwnd)
+                    if title:
+                        windows.append(SnapshotWindow(
+                            hwnd=hwnd,
+                            title=title,
+                            cleaned_title=clean_window_title(title, sanitize=True),
+                            class_name=win32gui.GetClassName(hwnd),
+                            pid=win32process.GetWindowThreadProcessId(hwnd)[1]
+                        ))
+            except Exception as e:
+                print(f"Error reading window {hwnd}: {e}")
+            return True
+
+        windows = []
+        try:
+            win32gui.EnumWindows(enum_window_callback, windows)
+        except Exception as e:
+            print(f"Error enumerating windows: {e}")
+        return tuple(windows)
+
+    def find_section(self, section):
+        return self.find_matcher(clean_window_title(section, sanitize=True))
+
+    def find_matcher(self, cleaned_section):
+        # Returns the first window whose cleaned title contains the cleaned section name
+        if cleaned_section in self._section_matches:
+            return self._section_matches[cleaned_section]
+
+        match = self.by_cleaned_title.get(cleaned_section)
+        if match is None:
+            for window in self.windows:
+                if cleaned_section in window.cleaned_title:
+                    match = window
+                    break
+
+        self._section_matches[cleaned_section] = match
+        return match
 
 class WindowManager:
-    def __init__(self):
+    def __init__(self, snapshot_service=None):
         self.managed_windows = []
         self.topmost_windows = set()
         self._window_states = {}
+        self.snapshot = None
+        # Publishes snapshots from a background thread, windows are enumerated here when missing
+        self.snapshot_service = snapshot_service
+
+        # Auto re-apply convergence tracking
+        self._reapply_attempts = {}
+        self._learned_offsets = {}
+        # Invisible resize borders of each window as it was placed, (left, top, right, bottom)
+        self._border_insets = {}
+        self.unconverged = {}
+        self._new_unconverged = []
+        self.reapply_times = deque()
+
+        # Sticky section to window bindings, so a section keeps its window while its title changes
+        self._bindings = {}
+        self.binding_hits = 0
+        self.binding_misses = 0
+        self.rebinds = 0
+        self.renamed = 0
         self.ignored_windows = [
             "window manager",
             "program manager",
@@ -21,59 +173,337 @@ class WindowManager:
         ]
 
 
-    def apply_window_config(self, config, hwnd, window_name=None):
-        if self.is_valid_window(hwnd):
+    def apply_window_configs(self, placements):
+        # placements: (hwnd, WindowRule) pairs. Blocks until every window is placed or the deadline passed,
+        # the GUI runs the three steps itself so the Tk thread never waits for the windows.
+        pending = self.start_apply(placements)
+        self.wait_apply(pending)
+        return self.finish_apply(pending)
+
+    def start_apply(self, placements):
+        # Tk thread, doesn't block. Every window is first probed with a short message timeout. Restoring
+        # and the frame style are the slow, per-window steps, they run on a small pool of daemon threads so
+        # a window that hangs mid-apply can't keep the application from closing. finish_apply then commits
+        # position, size and z-order of all responsive windows in config order as one DeferWindowPos
+        # transaction, so the layout lands in a single repaint. Windows that are hung, or miss the deadline,
+        # are reported as unresponsive and only get their placement posted with SWP_ASYNCWINDOWPOS.
+        pending = PendingApply(placements=list(placements), start=time.perf_counter())
+        job_queue = queue.Queue()
+        for hwnd, rule in pending.placements:
+            if not self.is_valid_window(hwnd) or not rule:
+                pending.statuses[hwnd] = ("invalid", 0.0)
+                continue
+            self.add_managed_window(hwnd)
+            self.reset_convergence(hwnd)
+            pending.rules[hwnd] = rule
+            if self.is_hung(hwnd):
+                pending.statuses[hwnd] = ("unresponsive", 0.0)
+                continue
+            pending.jobs[hwnd] = Future()
+            job_queue.put((pending.jobs[hwnd], self.prepare_window, hwnd, rule, pending.cancelled))
+        pending.workers = max(1, min(len(pending.jobs), ReapplyDefaults.APPLY_WORKERS))
+        for _ in range(min(pending.workers, len(pending.jobs))):
+            threading.Thread(target=self.run_jobs, args=(job_queue,), daemon=True).start()
+        return pending
+
+    def wait_apply(self, pending):
+        # Blocks until the workers are done or the deadline passed, not to be called from the Tk thread.
+        # Windows queued behind others get their share of the deadline.
+        rounds = -(-len(pending.jobs) // pending.workers)
+        done, _ = wait(pending.jobs.values(), timeout=ReapplyDefaults.APPLY_TIMEOUT_MS * max(1, rounds) / 1000)
+        # Workers stop before their next step, a call already blocked on a window finishes on its own
+        pending.cancelled.set()
+        for hwnd, job in pending.jobs.items():
+            if job not in done:
+                pending.statuses[hwnd] = ("unresponsive", (time.perf_counter() - pending.start) * 1000)
+                continue
+            try:
+                elapsed_ms, was_restored, style_changed = job.result()
+            except Exception as e:
+                print(f"Error applying window config: {e}")
+                pending.statuses[hwnd] = ("failed", 0.0)
+                continue
+            if elapsed_ms is None:
+                pending.statuses[hwnd] = ("unresponsive", (time.perf_counter() - pending.start) * 1000)
+                continue
+            pending.statuses[hwnd] = ("placed", elapsed_ms)
+            if was_restored:
+                pending.restored.append(hwnd)
+            if style_changed:
+                pending.frame_changed.add(hwnd)
+
+    def finish_apply(self, pending):
+        # Tk thread, commits the placements prepared by start_apply and wait_apply
+        statuses = pending.statuses
+        # Brought to the front from this thread, a worker thread may not take the foreground
+        for hwnd in pending.restored:
+            try:
+                win32gui.SetForegroundWindow(hwnd)
+            except Exception as e:
+                print(f"Error activating window {hwnd}: {e}")
+
+        unresponsive = {hwnd for hwnd, (status, _) in statuses.items() if status == "unresponsive"}
+        for hwnd in unresponsive:
+            print(f"Window {hwnd} is not responding, its position is applied once it responds again")
+
+        # One ordered transaction, the z-order follows the config order
+        commit_start = time.perf_counter()
+        placements = []
+        for hwnd, _ in pending.placements:
+            if statuses.get(hwnd, ("",))[0] not in ("placed", "unresponsive"):
+                continue
+            rule = pending.rules[hwnd]
+            flags = win32con.SWP_NOACTIVATE | win32con.SWP_NOOWNERZORDER
+            if hwnd in pending.frame_changed or hwnd in unresponsive:
+                # A style change of a window that timed out may still land
+                flags |= win32con.SWP_FRAMECHANGED
+            position, size, flags = self.placement_geometry(rule, flags)
+            insert_after = win32con.HWND_TOPMOST if rule.always_on_top else win32con.HWND_NOTOPMOST
+            placements.append((hwnd, insert_after, *position, *size, flags))
+        committed = set(self.commit_window_positions(placements, unresponsive))
+        commit_ms = (time.perf_counter() - commit_start) * 1000
+
+        windows = []
+        for hwnd, _ in pending.placements:
+            status, elapsed_ms = statuses[hwnd]
+            if status == "placed" and hwnd not in committed:
+                status = "failed"
+            windows.append(WindowApplyResult(hwnd=hwnd, status=status, elapsed_ms=elapsed_ms))
+        return ApplyResult(windows=tuple(windows), commit_ms=commit_ms,
+                           total_ms=(time.perf_counter() - pending.start) * 1000)
+
+    @staticmethod
+    def run_jobs(job_queue):
+        # Daemon worker thread, runs (future, func, *args) jobs until the queue is empty
+        while True:
+            try:
+                future, func, *args = job_queue.get_nowait()
+            except queue.Empty:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+
+    @staticmethod
+    def placement_geometry(rule, flags):
+        # Position, size and flags of a SetWindowPos call for the configured geometry
+        position = rule.position
+        if not position:
+            position = (0, 0)
+            flags |= win32con.SWP_NOMOVE
+        size = rule.size
+        if not size:
+            size = (0, 0)
+            flags |= win32con.SWP_NOSIZE
+        return position, size, flags
+
+    def prepare_window(self, hwnd, rule, cancelled):
+        # Worker thread, restores the window and sets its frame style.
+        # Returns the time it took, whether the window was restored and whether its style changed,
+        # the time is None when the window did not answer the probe or the apply was given up.
+        start = time.perf_counter()
+        if not self.responds(hwnd):
+            return None, False, False
+
+        restored = False
+        if win32gui.IsIconic(hwnd):
+            if cancelled.is_set():
+                return None, False, False
+            win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+            restored = True
+
+        if cancelled.is_set():
+            return None, restored, False
+        style_changed = self.set_frame_style(hwnd, rule.has_titlebar)
+        return (time.perf_counter() - start) * 1000, restored, style_changed
+
+    def responds(self, hwnd, timeout_ms=ReapplyDefaults.PROBE_TIMEOUT_MS):
+        # Sends WM_NULL with a timeout, False when the window did not process it in time
+        result = ctypes.c_size_t()
+        try:
+            return bool(_user32.SendMessageTimeoutW(hwnd, win32con.WM_NULL, 0, 0, SMTO_ABORTIFHUNG | SMTO_ERRORONEXIT,
+                                                    timeout_ms, ctypes.byref(result)))
+        except Exception:
+            return False
+
+    def is_hung(self, hwnd):
+        # True when the window has not processed messages for several seconds
+        try:
+            return bool(_user32.IsHungAppWindow(hwnd))
+        except Exception:
+            return False
+
+    def is_responsive(self, hwnd):
+        # Checked before synchronous calls from the Tk thread. is_hung only trips after several seconds,
+        # the short probe also catches a window that just stopped responding.
+        return not self.is_hung(hwnd) and self.responds(hwnd)
+
+    def reconcile_windows(self, drifted_windows):
+        # drifted_windows: (hwnd, drift) pairs where drift maps each drifted property to its configured value.
+        # No reset step, each window gets at most one style change and one SetWindowPos.
+        pending = []
+        for hwnd, drift in drifted_windows:
+            if not self.is_valid_window(hwnd) or not drift:
+                continue
+            if not self.is_responsive(hwnd):
+                # Left for a later pass instead of blocking on the style change
+                continue
             try:
-                if not config:
-                    return False
-                
                 self.add_managed_window(hwnd)
-                window = gw.Window(hwnd)
-                if window.isMinimized:
-                    win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-                    win32gui.SetForegroundWindow(hwnd)
-
-                if isinstance(config, dict):
-                    # Get configuration values
-                    has_titlebar = config.get('has_titlebar', True)
-                    if 'position' in config and config['position']:
-                        position = eval(config['position']) if isinstance(config['position'], str) else config['position']
-                    if 'size' in config and config['size']:
-                        size = eval(config['size']) if isinstance(config['size'], str) else config['size']
-                    if 'always_on_top' in config:
-                        always_on_top = config['always_on_top']
-
-                    # Apply settings
-                    apply_funcs = {
-                        'aot': (self.set_always_on_top, always_on_top),
-                        'titlebar': (self.keep_titlebar, has_titlebar),
-                        'pos': (self.set_window_position, position[0], position[1]),
-                        'size': (self.set_window_size, size[0], size[1])
-                    }
-
-                    default_apply_order = [
-                        'titlebar',
-                        'pos',
-                        'size',
-                        'aot'
-                        ]
-
-                    if window_name == 'Diablo IV':
-                        apply_order = ['titlebar', 'pos', 'size', 'aot'] # Example override for specific game
-                    else:
-                        apply_order = default_apply_order
-
-                    for key in apply_order:
-                        args = apply_funcs[key][1:]
-                        if args:
-                            apply_funcs[key][0](hwnd, *args)
-                        time.sleep(0.1)
+                flags = win32con.SWP_NOACTIVATE | win32con.SWP_NOOWNERZORDER
 
-                return True
+                if 'has_titlebar' in drift and self.set_frame_style(hwnd, drift['has_titlebar']):
+                    flags |= win32con.SWP_FRAMECHANGED
+
+                position = drift.get('position')
+                if not position:
+                    position = (0, 0)
+                    flags |= win32con.SWP_NOMOVE
+
+                size = drift.get('size')
+                if not size:
+                    size = (0, 0)
+                    flags |= win32con.SWP_NOSIZE
+
+                if 'always_on_top' in drift:
+                    insert_after = win32con.HWND_TOPMOST if drift['always_on_top'] else win32con.HWND_NOTOPMOST
+                else:
+                    insert_after = 0
+                    flags |= win32con.SWP_NOZORDER
+
+                pending.append((hwnd, insert_after, position[0], position[1], size[0], size[1], flags))
+
+                attempts = self._reapply_attempts.setdefault(hwnd, {})
+                for prop in drift:
+                    attempts[prop] = attempts.get(prop, 0) + 1
 
             except Exception as e:
-                print(f"Error applying window config: {e}")
-                return False
+                print(f"Error reconciling window {hwnd}: {e}")
+
+        placed = self.commit_window_positions(pending)
+        now = time.monotonic()
+        self.reapply_times.extend(now for _ in placed)
+        return placed
+
+    def compare_window_data(self, hwnd, rule, metrics):
+        # Returns the drifted properties mapped to their configured values, empty when the window matches.
+        # The visible frame is compared against the configured rect minus the borders the window had
+        # when it was placed, so its invisible resize borders don't count as drift.
+        drift = {}
+        offsets = self._learned_offsets.get(hwnd, {})
+        given_up = self.unconverged.get(hwnd, set())
+        frame = metrics['frame']
+        # Windows placed before the borders were recorded use their current borders
+        left, top, right, bottom = self._border_insets.setdefault(hwnd, metrics['borders'])
+
+        residuals = {}
+        if rule.position:
+            x, y = rule.position
+            residuals['position'] = (frame[0] - (x + left), frame[1] - (y + top))
+        if rule.size:
+            width, height = rule.size
+            residuals['size'] = ((frame[2] - frame[0]) - (width - left - right),
+                                 (frame[3] - frame[1]) - (height - top - bottom))
+
+        for prop, residual in residuals.items():
+            offset = offsets.get(prop, (0, 0))
+            if any(abs(value - expected) > rule.tolerance for value, expected in zip(residual, offset)):
+                drift[prop] = getattr(rule, prop)
+
+        metrics_aot = (metrics['exstyle'] & win32con.WS_EX_TOPMOST) != 0
+        if rule.always_on_top != metrics_aot and 'always_on_top' not in given_up:
+            drift['always_on_top'] = rule.always_on_top
+
+        metrics_titlebar = (metrics['style'] & win32con.WS_CAPTION) == win32con.WS_CAPTION
+        if rule.has_titlebar != metrics_titlebar and 'has_titlebar' not in given_up:
+            drift['has_titlebar'] = rule.has_titlebar
+
+        # Stop retrying properties the window keeps rejecting
+        attempts = self._reapply_attempts.setdefault(hwnd, {})
+        for prop in list(attempts):
+            if prop not in drift:
+                del attempts[prop]
+        for prop in list(drift):
+            if attempts.get(prop, 0) < ReapplyDefaults.MAX_REAPPLY_ATTEMPTS:
+                continue
+            if prop in residuals:
+                # The window settles here on its own, accept it as this window's offset
+                self._learned_offsets.setdefault(hwnd, {})[prop] = residuals[prop]
+            else:
+                self.unconverged.setdefault(hwnd, set()).add(prop)
+            self._new_unconverged.append((hwnd, prop))
+            del attempts[prop]
+            del drift[prop]
+
+        return drift
+
+    def reset_convergence(self, hwnd):
+        self._reapply_attempts.pop(hwnd, None)
+        self._learned_offsets.pop(hwnd, None)
+        self._border_insets.pop(hwnd, None)
+        self.unconverged.pop(hwnd, None)
+
+    def pop_unconverged(self):
+        reports, self._new_unconverged = self._new_unconverged, []
+        return reports
+
+    def reapplies_per_minute(self):
+        cutoff = time.monotonic() - 60
+        while self.reapply_times and self.reapply_times[0] < cutoff:
+            self.reapply_times.popleft()
+        return len(self.reapply_times)
+
+    def commit_window_positions(self, pending, unresponsive=()):
+        # Returns the hwnds that were placed, through the deferred batch or the fallback path.
+        # Windows known to be unresponsive, or hung since they were prepared, skip the batch,
+        # EndDeferWindowPos would wait for them.
+        placed = []
+        rejected = [placement for placement in pending if placement[0] in unresponsive or self.is_hung(placement[0])]
+        batch = [placement for placement in pending if placement not in rejected]
+
+        while batch:
+            failed_index = None
+            hdwp = _user32.BeginDeferWindowPos(len(batch))
+            if not hdwp:
+                break
+            for index, placement in enumerate(batch):
+                hdwp = _user32.DeferWindowPos(hdwp, *placement)
+                if not hdwp:
+                    # The whole batch is discarded by Windows, retry it without this window
+                    failed_index = index
+                    break
+
+            if failed_index is not None:
+                rejected.append(batch.pop(failed_index))
+                continue
+            if _user32.EndDeferWindowPos(hdwp):
+                placed.extend(placement[0] for placement in batch)
+                batch = []
+            break
+
+        # Windows that rejected deferral, or a batch that failed to commit, are placed one by one.
+        # SWP_ASYNCWINDOWPOS posts the request to the window's thread instead of waiting for it.
+        for hwnd, insert_after, x, y, width, height, flags in rejected + batch:
+            try:
+                win32gui.SetWindowPos(hwnd, insert_after, x, y, width, height, flags | win32con.SWP_ASYNCWINDOWPOS)
+                placed.append(hwnd)
+            except Exception as e:
+                print(f"Error setting window position for {hwnd}: {e}")
+
+        for hwnd in placed:
+            self.record_border_insets(hwnd)
+
+        for hwnd, insert_after, *_, flags in pending:
+            if hwnd not in placed or flags & win32con.SWP_NOZORDER:
+                continue
+            if insert_after == win32con.HWND_TOPMOST:
+                self.topmost_windows.add(hwnd)
+            else:
+                self.topmost_windows.discard(hwnd)
+        return placed
 
 # Apply window config helper functions
     def set_always_on_top(self, hwnd, enable):
@@ -119,6 +549,16 @@ class WindowManager:
                 print(f"Error setting window size for {hwnd}: {e}")
                 return False
 
+    def set_frame_style(self, hwnd, has_titlebar):
+        # Only updates the style bits, the caller is responsible for sending SWP_FRAMECHANGED
+        frame = win32con.WS_CAPTION | win32con.WS_BORDER | win32con.WS_THICKFRAME
+        style = win32gui.GetWindowLong(hwnd, win32con.GWL_STYLE)
+        new_style = (style | frame) if has_titlebar else (style & ~frame)
+        if new_style == style:
+            return False
+        win32gui.SetWindowLong(hwnd, win32con.GWL_STYLE, new_style)
+        return True
+
     def keep_titlebar(self, hwnd, restore=False):
         if restore:
             return self.restore_window_frame(hwnd)
@@ -163,6 +603,7 @@ class WindowManager:
                     
                     del self._window_states[hwnd]
                 
+                self.reset_convergence(hwnd)
                 self.managed_windows.remove(hwnd)
                 if hwnd in self.topmost_windows:
                     self.topmost_windows.remove(hwnd)
@@ -173,6 +614,13 @@ class WindowManager:
     def reset_all_windows(self):
         windows_to_reset = self.managed_windows.copy()
         for hwnd in windows_to_reset:
+            if not self.is_responsive(hwnd):
+                # Restoring would block until the window responds, it is released as it is
+                print(f"Not resetting window {hwnd}, it is not responding")
+                self.managed_windows.remove(hwnd)
+                self._window_states.pop(hwnd, None)
+                self.reset_convergence(hwnd)
+                continue
             self.set_always_on_top(hwnd, enable=False)
             self.restore_window_frame(hwnd)
             self.remove_managed_window(hwnd)
@@ -200,9 +648,12 @@ class WindowManager:
     def get_window_metrics(self, hwnd):
         try:
             rect = win32gui.GetWindowRect(hwnd)
+            frame = self.get_frame_bounds(hwnd) or rect
             return {
                 'position': (rect[0], rect[1]),
                 'size': (rect[2] - rect[0], rect[3] - rect[1]),
+                'frame': frame,
+                'borders': (frame[0] - rect[0], frame[1] - rect[1], rect[2] - frame[2], rect[3] - frame[3]),
                 'style': win32gui.GetWindowLong(hwnd, win32con.GWL_STYLE),
                 'exstyle': win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
             }
@@ -210,6 +661,24 @@ class WindowManager:
             print(f"Error getting window metrics: {e}")
             return None
 
+    def record_border_insets(self, hwnd):
+        # Measured after placing, the frame style decides how wide the invisible borders are
+        try:
+            rect = win32gui.GetWindowRect(hwnd)
+            frame = self.get_frame_bounds(hwnd) or rect
+            self._border_insets[hwnd] = (frame[0] - rect[0], frame[1] - rect[1], rect[2] - frame[2], rect[3] - frame[3])
+        except Exception as e:
+            print(f"Error reading window borders for {hwnd}: {e}")
+
+    def get_frame_bounds(self, hwnd):
+        # Visible window bounds, without the invisible DWM resize borders
+        rect = wintypes.RECT()
+        result = _dwmapi.DwmGetWindowAttribute(hwnd, DWMWA_EXTENDED_FRAME_BOUNDS,
+                                               ctypes.byref(rect), ctypes.sizeof(rect))
+        if result != 0:
+            return None
+        return (rect.left, rect.top, rect.right, rect.bottom)
+
     def restore_window_frame(self, hwnd):
         if self.is_valid_window(hwnd):
             try:
@@ -224,36 +693,101 @@ class WindowManager:
                 print(f"Error restoring window frame for hwnd: {hwnd}, error: {e}")
                 return False
 
-    def find_matching_windows(self, config):
+    def take_snapshot(self):
+        self.snapshot = WindowSnapshot()
+        return self.snapshot
+
+    def current_snapshot(self):
+        # Latest published snapshot without blocking, for GUI callbacks. A stale one requests a refresh.
+        if self.snapshot_service:
+            snapshot = self.snapshot_service.latest(ReapplyDefaults.SNAPSHOT_STALE_MS)
+            if snapshot:
+                self.snapshot = snapshot
+                return snapshot
+        return self.take_snapshot()
+
+    def request_snapshot(self, callback, max_age_ms=ReapplyDefaults.SNAPSHOT_MAX_AGE_MS):
+        # Calls callback(snapshot) with a snapshot no older than max_age_ms, for applying a config.
+        # Without a service, or when enumeration failed, the snapshot is taken on the calling thread.
+        def deliver(snapshot):
+            self.snapshot = snapshot or WindowSnapshot()
+            callback(self.snapshot)
+
+        if self.snapshot_service:
+            self.snapshot_service.request(deliver, max_age_ms)
+        else:
+            deliver(None)
+
+    def reset_bindings(self):
+        self._bindings = {}
+        self.binding_hits = 0
+        self.binding_misses = 0
+        self.rebinds = 0
+        self.renamed = 0
+
+    def binding_hit_rate(self):
+        lookups = self.binding_hits + self.binding_misses
+        return self.binding_hits / lookups if lookups else None
+
+    def bound_window(self, rule, snapshot):
+        # The window the section was bound to, as long as the handle is valid and still belongs to the same
+        # class and process, a reused handle never does. The title is only a soft signal: a window whose
+        # title changed, even to one the section no longer matches, keeps its binding and is counted as
+        # renamed. The trade-off is that a window that turns into something else under the same handle
+        # (a launcher becoming the game, a browser switching tabs) keeps the section until it closes.
+        binding = self._bindings.get(rule.section)
+        if binding and self.is_valid_window(binding.hwnd):
+            window = snapshot.by_hwnd.get(binding.hwnd)
+            if window and window.class_name == binding.class_name and window.pid == binding.pid:
+                self.binding_hits += 1
+                if window.title != binding.title:
+                    if rule.matcher not in window.cleaned_title:
+                        self.renamed += 1
+                    self._bind(rule, window)
+                return window
+
+        self.binding_misses += 1
+        window = snapshot.find_matcher(rule.matcher)
+        if window is None:
+            self._bindings.pop(rule.section, None)
+            return None
+        if binding and binding.hwnd != window.hwnd:
+            self.rebinds += 1
+        self._bind(rule, window)
+        return window
+
+    def _bind(self, rule, window):
+        self._bindings[rule.section] = WindowBinding(
+            hwnd=window.hwnd,
+            title=window.title,
+            class_name=window.class_name,
+            pid=window.pid
+        )
+
+    def find_matching_windows(self, rules, snapshot=None, sticky=False):
+        # With sticky, sections keep the window they were bound to by an earlier call while it stays valid
         matching_windows = []
         missing_windows = []
         
         try:
-            if not config or len(config.sections()) == 0:
+            if not rules:
                 return matching_windows, missing_windows
 
-            all_titles = gw.getAllTitles()
+            snapshot = snapshot or self.current_snapshot()
             
-            for section in config.sections():
-                cleaned_section = clean_window_title(section, sanitize=True)
-                window_exists = False
-                
-                for title in all_titles:
-                    if not title:
-                        continue
-                    cleaned_title = clean_window_title(title, sanitize=True)
-                    if cleaned_section in cleaned_title:
-                        window = gw.getWindowsWithTitle(title)[0]
-                        matching_windows.append({
-                            'config_name': section,
-                            'window': window,
-                            'hwnd': window._hWnd
-                        })
-                        window_exists = True
-                        break
-                        
-                if not window_exists:
-                    missing_windows.append(section)
+            for rule in rules:
+                if sticky:
+                    window = self.bound_window(rule, snapshot)
+                else:
+                    window = snapshot.find_matcher(rule.matcher)
+                if window:
+                    matching_windows.append({
+                        'config_name': rule.section,
+                        'hwnd': window.hwnd,
+                        'rule': rule
+                    })
+                else:
+                    missing_windows.append(rule.section)
                     
             return matching_windows, missing_windows
         except Exception as e:
@@ -262,7 +796,7 @@ class WindowManager:
 
     def toggle_always_on_top(self, hwnd):
         try:
-            if hwnd in self.topmost_windows:
+            if hwnd in self.topmost_windows and self.is_responsive(hwnd):
                 is_topmost = (win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE) & win32con.WS_EX_TOPMOST) != 0
                 flag = win32con.HWND_TOPMOST if not is_topmost else win32con.HWND_NOTOPMOST
                 win32gui.SetWindowPos(hwnd, flag, 0, 0, 0, 0, win32con.SWP_NOMOVE | win32con.SWP_NOSIZE | win32con.SWP_NOOWNERZORDER)
@@ -271,17 +805,11 @@ class WindowManager:
             print(f"Error toggling always-on-top: {e}")
             return False
 
-    def get_all_window_titles(self):
+    def get_all_window_titles(self, snapshot=None):
         try:
-            def enum_window_callback(hwnd, windows):
-                if win32gui.IsWindowVisible(hwnd):
-                    title = win32gui.GetWindowText(hwnd)
-                    if title and not title.lower() in self.ignored_windows:
-                        windows.append(title)
-                return True
-
-            windows = []
-            win32gui.EnumWindows(enum_window_callback, windows)
+            snapshot = snapshot or self.current_snapshot()
+            windows = [window.title for window in snapshot.windows
+                       if not window.title.lower() in self.ignored_windows]
             return sorted(windows)
         except Exception as e:
             print(f"Error getting window titles: {e}")
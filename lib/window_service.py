@@ -0,0 +1,104 @@
+import time
+import threading
+
+# Local imports
+from lib.constants import ReapplyDefaults
+from lib.window_manager import WindowSnapshot
+
+class WindowSnapshotService:
+    # Enumerates windows on a background thread and publishes each WindowSnapshot as a new version.
+    # A published snapshot is replaced, never updated, so readers on any thread can use latest() without
+    # locking, and a window that stalls title queries only delays the next version instead of the GUI.
+    # Windows are only enumerated when a snapshot is requested, so an idle application enumerates nothing.
+    def __init__(self, on_publish=None):
+        # on_publish(snapshot) is called from the service thread after each new version
+        self.on_publish = on_publish
+        self.version = 0
+
+        self._snapshot = None
+        self._busy = False
+        self._callbacks = []
+        self._condition = threading.Condition()
+        self._refresh_requested = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        # The first snapshot is taken right away
+        self._refresh_requested.set()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._refresh_requested.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    def latest(self, max_age_ms=None):
+        # Never blocks. A snapshot older than max_age_ms is still returned but a refresh is requested.
+        snapshot = self._snapshot
+        if snapshot and max_age_ms is not None and self.age_ms(snapshot) > max_age_ms:
+            self._refresh_requested.set()
+        return snapshot
+
+    @staticmethod
+    def age_ms(snapshot):
+        return (time.monotonic() - snapshot.created) * 1000
+
+    def request(self, callback, max_age_ms=ReapplyDefaults.SNAPSHOT_MAX_AGE_MS):
+        # Never blocks. Calls callback(snapshot) with a snapshot no older than max_age_ms, right away when
+        # the latest one is recent enough, otherwise from the service thread once a new one is published.
+        # A max_age_ms of 0 forces a refresh.
+        snapshot = self._snapshot
+        if snapshot and max_age_ms > 0 and self.age_ms(snapshot) <= max_age_ms:
+            callback(snapshot)
+            return
+        with self._condition:
+            # An enumeration already running may have read some windows before this call
+            target = self.version + (2 if self._busy else 1)
+            self._callbacks.append((target, callback))
+            self._refresh_requested.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._refresh_requested.wait()
+            if self._stop.is_set():
+                break
+            self._refresh_requested.clear()
+
+            with self._condition:
+                self._busy = True
+            try:
+                snapshot = WindowSnapshot()
+            except Exception as e:
+                print(f"Error taking window snapshot: {e}")
+                snapshot = None
+
+            with self._condition:
+                self._busy = False
+                if snapshot is not None:
+                    self._snapshot = snapshot
+                    self.version += 1
+                # Callbacks still waiting for a later version get the latest one if enumeration failed
+                ready = [callback for target, callback in self._callbacks if snapshot is None or self.version >= target]
+                self._callbacks = [(target, callback) for target, callback in self._callbacks
+                                   if snapshot is not None and self.version < target]
+                if self._callbacks:
+                    self._refresh_requested.set()
+                latest = self._snapshot
+
+            for callback in ready:
+                try:
+                    callback(latest)
+                except Exception as e:
+                    print(f"Error handling window snapshot: {e}")
+            if snapshot is not None and self.on_publish:
+                try:
+                    self.on_publish(snapshot)
+                except Exception as e:
+                    print(f"Error publishing window snapshot: {e}")
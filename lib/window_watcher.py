@@ -0,0 +1,230 @@
+import time
+import ctypes
+import threading
+from ctypes import wintypes
+
+# Local imports
+from lib.utils import clean_window_title
+from lib.constants import ReapplyDefaults
+
+EVENT_OBJECT_CREATE = 0x8000
+EVENT_OBJECT_DESTROY = 0x8001
+EVENT_OBJECT_LOCATIONCHANGE = 0x800B
+EVENT_OBJECT_NAMECHANGE = 0x800C
+
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+OBJID_WINDOW = 0
+CHILDID_SELF = 0
+GA_ROOT = 2
+
+WM_QUIT = 0x0012
+WM_APP = 0x8000
+# Posted to the watcher thread when the hooked processes change
+WM_REHOOK = WM_APP + 1
+PM_REMOVE = 0x0001
+QS_ALLINPUT = 0x04FF
+INFINITE = 0xFFFFFFFF
+
+_user32 = ctypes.WinDLL("user32", use_last_error=True)
+_kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+
+WinEventProc = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                  wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+
+_user32.SetWinEventHook.argtypes = [wintypes.DWORD, wintypes.DWORD, wintypes.HMODULE, WinEventProc,
+                                    wintypes.DWORD, wintypes.DWORD, wintypes.DWORD]
+_user32.SetWinEventHook.restype = wintypes.HANDLE
+_user32.UnhookWinEvent.argtypes = [wintypes.HANDLE]
+_user32.UnhookWinEvent.restype = wintypes.BOOL
+_user32.GetWindowThreadProcessId.argtypes = [wintypes.HWND, ctypes.POINTER(wintypes.DWORD)]
+_user32.GetWindowThreadProcessId.restype = wintypes.DWORD
+_user32.GetAncestor.argtypes = [wintypes.HWND, wintypes.UINT]
+_user32.GetAncestor.restype = wintypes.HWND
+# Reads the title without sending WM_GETTEXT, so a hung window can't block the hook thread
+_user32.InternalGetWindowText.argtypes = [wintypes.HWND, wintypes.LPWSTR, ctypes.c_int]
+_user32.InternalGetWindowText.restype = ctypes.c_int
+_user32.MsgWaitForMultipleObjects.argtypes = [wintypes.DWORD, ctypes.c_void_p, wintypes.BOOL,
+                                              wintypes.DWORD, wintypes.DWORD]
+_user32.MsgWaitForMultipleObjects.restype = wintypes.DWORD
+_user32.PeekMessageW.argtypes = [ctypes.POINTER(wintypes.MSG), wintypes.HWND, wintypes.UINT,
+                                 wintypes.UINT, wintypes.UINT]
+_user32.PeekMessageW.restype = wintypes.BOOL
+_user32.PostThreadMessageW.argtypes = [wintypes.DWORD, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+_user32.PostThreadMessageW.restype = wintypes.BOOL
+
+
+class WindowEventWatcher:
+    # Listens for WinEvents on a dedicated thread and reports which managed windows changed.
+    # Bursts of events are coalesced and on_change(dirty_hwnds, topology_changed) is called
+    # from the watcher thread once the burst has settled.
+    # New and renamed windows only count as a topology change while some config section is unmatched
+    # and the window's title matches one of those sections.
+    # Only window creation and destruction are hooked desktop-wide. Location and name changes are hooked
+    # per process of the managed windows, so cursor and caret moves elsewhere never reach Python, plus
+    # desktop-wide name changes while a section is unmatched, as a window often gets its title after it
+    # was created.
+    def __init__(self, on_change, coalesce_ms=ReapplyDefaults.EVENT_COALESCE_MS):
+        self.on_change = on_change
+        self.coalesce = coalesce_ms / 1000
+        self.running = False
+
+        self._watched = frozenset()
+        self._pending_matchers = frozenset()
+        self._processes = frozenset()
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._topology_changed = False
+        self._deadline = None
+
+        self._thread = None
+        self._thread_id = None
+        self._ready = threading.Event()
+        self._proc = WinEventProc(self._on_event)
+
+    def watch(self, hwnds, pending_matchers=()):
+        # pending_matchers: matchers of the config sections without a window
+        self._watched = frozenset(hwnds)
+        pending_matchers = frozenset(pending_matchers)
+        processes = frozenset(filter(None, map(self._process_id, self._watched)))
+        rehook = processes != self._processes or bool(pending_matchers) != bool(self._pending_matchers)
+        self._pending_matchers = pending_matchers
+        self._processes = processes
+        if rehook and self._thread_id:
+            # Hooks are delivered to the thread that set them, the watcher thread sets them again.
+            # When its queue isn't created yet, it reads the new processes once it sets its first hooks.
+            _user32.PostThreadMessageW(self._thread_id, WM_REHOOK, 0, 0)
+
+    @staticmethod
+    def _process_id(hwnd):
+        pid = wintypes.DWORD()
+        _user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+        return pid.value
+
+    def start(self):
+        if self.running:
+            return True
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=1)
+        return self.running
+
+    def stop(self):
+        if self._thread and self._thread.is_alive() and self._thread_id:
+            _user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    def _on_event(self, hook, event, hwnd, id_object, id_child, event_thread, event_time):
+        if id_object != OBJID_WINDOW or id_child != CHILDID_SELF or not hwnd:
+            return
+
+        watched = hwnd in self._watched
+        topology_changed = False
+        if event in (EVENT_OBJECT_CREATE, EVENT_OBJECT_NAMECHANGE) and not watched:
+            # A new or renamed top-level window may now match a missing config section
+            topology_changed = (bool(self._pending_matchers) and _user32.GetAncestor(hwnd, GA_ROOT) == hwnd
+                                and self._matches_pending(hwnd))
+        elif event == EVENT_OBJECT_DESTROY:
+            topology_changed = watched
+
+        if not watched and not topology_changed:
+            return
+
+        with self._lock:
+            if watched:
+                self._dirty.add(hwnd)
+            self._topology_changed |= topology_changed
+            if self._deadline is None:
+                self._deadline = time.monotonic() + self.coalesce
+
+    def _matches_pending(self, hwnd):
+        buffer = ctypes.create_unicode_buffer(512)
+        if not _user32.InternalGetWindowText(hwnd, buffer, len(buffer)):
+            return False
+        title = clean_window_title(buffer.value, sanitize=True)
+        return any(matcher in title for matcher in self._pending_matchers)
+
+    def _flush(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            topology_changed, self._topology_changed = self._topology_changed, False
+            self._deadline = None
+
+        try:
+            self.on_change(dirty, topology_changed)
+        except Exception as e:
+            print(f"Error handling window events: {e}")
+
+    def _update_hooks(self, process_hooks, name_hook):
+        # Watcher thread. Hooks location and name changes of the managed processes and, while a section
+        # is unmatched, name changes of every process. Returns the new name hook.
+        flags = WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS
+        processes = self._processes
+        for pid in list(process_hooks):
+            if pid not in processes:
+                _user32.UnhookWinEvent(process_hooks.pop(pid))
+        for pid in processes:
+            if pid in process_hooks:
+                continue
+            hook = _user32.SetWinEventHook(EVENT_OBJECT_LOCATIONCHANGE, EVENT_OBJECT_NAMECHANGE, None,
+                                           self._proc, pid, 0, flags)
+            if hook:
+                process_hooks[pid] = hook
+            else:
+                print(f"Failed to register window event hook for process {pid}")
+
+        if self._pending_matchers and not name_hook:
+            name_hook = _user32.SetWinEventHook(EVENT_OBJECT_NAMECHANGE, EVENT_OBJECT_NAMECHANGE, None,
+                                                self._proc, 0, 0, flags)
+        elif not self._pending_matchers and name_hook:
+            _user32.UnhookWinEvent(name_hook)
+            name_hook = None
+        return name_hook
+
+    def _run(self):
+        self._thread_id = _kernel32.GetCurrentThreadId()
+        flags = WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS
+        hook = _user32.SetWinEventHook(EVENT_OBJECT_CREATE, EVENT_OBJECT_DESTROY, None, self._proc, 0, 0, flags)
+        process_hooks = {}
+        name_hook = None
+
+        try:
+            if not hook:
+                print("Failed to register window event hooks")
+                return
+            name_hook = self._update_hooks(process_hooks, name_hook)
+
+            self.running = True
+            self._ready.set()
+
+            msg = wintypes.MSG()
+            while True:
+                deadline = self._deadline
+                if deadline is None:
+                    timeout = INFINITE
+                else:
+                    timeout = max(0, int((deadline - time.monotonic()) * 1000))
+
+                _user32.MsgWaitForMultipleObjects(0, None, False, timeout, QS_ALLINPUT)
+
+                # Out-of-context hooks are delivered while the queue is pumped
+                while _user32.PeekMessageW(ctypes.byref(msg), None, 0, 0, PM_REMOVE):
+                    if msg.message == WM_QUIT:
+                        return
+                    if msg.message == WM_REHOOK:
+                        name_hook = self._update_hooks(process_hooks, name_hook)
+                        continue
+                    _user32.TranslateMessage(ctypes.byref(msg))
+                    _user32.DispatchMessageW(ctypes.byref(msg))
+
+                if self._deadline is not None and time.monotonic() >= self._deadline:
+                    self._flush()
+        finally:
+            for handle in [hook, name_hook, *process_hooks.values()]:
+                if handle:
+                    _user32.UnhookWinEvent(handle)
+            self.running = False
+            self._thread_id = None
+            self._ready.set()
@@ -1,17 +1,27 @@
 import os
 import sys
+import bisect
 import importlib
 import threading
+import multiprocessing
+from concurrent.futures import Future
 import tkinter as tk
 from ctypes import windll
 import tkinter.messagebox as messagebox
 
 # Local imports
 from lib.layout import TkGUIManager
-from lib.constants import UIConstants
+from lib.constants import UIConstants, ReapplyDefaults, IgdbDefaults
 from lib.asset_manager import AssetManager
 from lib.window_manager import WindowManager
+from lib.window_watcher import WindowEventWatcher
+from lib.window_service import WindowSnapshotService
+from lib.dir_watcher import DirectoryWatcher, REMOVED
+from lib.downloader import DownloadScheduler
+from lib.dispatcher import UiDispatcher
 from lib.config_manager import ConfigManager
+from lib.asset_index import AssetIndex, get_asset_index
+from lib.thumbnail_store import get_thumbnail_store
 from lib.utils import WindowInfo, clean_window_title
 
 class ApplicationState:
@@ -20,6 +30,15 @@ class ApplicationState:
         self.window_manager = None
         self.config_manager = None
         self.asset_manager = None
+        self.window_watcher = None
+        self.snapshot_service = None
+
+        # Background threads update the GUI only through the dispatcher
+        self.dispatcher = UiDispatcher()
+        self.managers_ready = Future()
+        self.config_watcher = None
+        self.asset_watcher = None
+        self.downloader = None
 
         # Assets
         self.assets_dir = None
@@ -42,65 +61,100 @@ class ApplicationState:
         # Config state
         self.config_files = []
         self.config_names = []
-        self.config = None
+        self.rules = None
         self.config_dir = None
-        self.applied_config = None
+        self.applied_rules = None
+        self.applied_matches = []
+        # An apply waiting for its windows, committed by finish_apply
+        self.pending_apply = None
+        self.reapply_stats_job = None
+        self.shown_missing = set()
 
 ######################
 # Callback functions #
 ######################
 
-    def apply_settings(self, reapply=False):
-        if not reapply:
-            for child in self.app.buttons_1_container.winfo_children():
-                if child.cget("text") == "Apply config":
-                    selected_config = self.config_files[self.config_names.index(self.app.combo_box.get())]
-                    selected_config_shortname = selected_config.replace('config_', '').replace('.ini', '')
-                    config = self.config_manager.load_config(selected_config)
-
-                    self.applied_config = config
-
-                    child.configure(style="Active.TButton", text="Reset config")
-                    self.app.info_label['text'] = f"Active config: {selected_config_shortname}"
-                    self.app.aot_button.configure(style='TButton', state=tk.NORMAL)
-
-                elif child.cget("text") == "Reset config" and not reapply:
-                    self.applied_config = None
-                    self.window_manager.reset_all_windows()
-                    child.configure(style="TButton", text="Apply config")
-                    self.app.info_label['text'] = f""
-                    self.app.aot_button.configure(style='Disabled.TButton', state=tk.DISABLED)
-                    self.app.reapply.set(0)
-
-        if self.applied_config:
-            matching_windows, _ = self.window_manager.find_matching_windows(self.applied_config)
-            self.window_manager.reset_all_windows()
-            
-            # Apply configuration
-            for match in matching_windows:
-                try:
-                    hwnd = match['hwnd']
-                    section = match['config_name']
-                    settings = {
-                        'position': self.applied_config.get(section, 'position', fallback=None),
-                        'size': self.applied_config.get(section, 'size', fallback=None),
-                        'always_on_top': self.applied_config.getboolean(section, 'always_on_top', fallback=False),
-                        'has_titlebar': self.applied_config.getboolean(section, 'titlebar', fallback=True)
-                    }
-                    
-                    self.window_manager.apply_window_config(settings, hwnd, section)
-                    
-                except Exception as e:
-                    print(f"Error applying settings to window {match['config_name']}: {e}")
-                    continue
-                
+    def apply_settings(self):
+        for child in self.app.buttons_1_container.winfo_children():
+            if child.cget("text") == "Apply config":
+                selected_config = self.config_files[self.config_names.index(self.app.combo_box.get())]
+                selected_config_shortname = selected_config.replace('config_', '').replace('.ini', '')
+                self.applied_rules = self.config_manager.load_rules(selected_config)
+                self.window_manager.reset_bindings()
+
+                child.configure(style="Active.TButton", text="Reset config")
+                self.app.info_label['text'] = f"Active config: {selected_config_shortname}"
+                self.app.aot_button.configure(style='TButton', state=tk.NORMAL)
+
+            elif child.cget("text") == "Reset config":
+                self.applied_rules = None
+                self.applied_matches = []
+                self.cancel_pending_apply()
+                self.window_manager.reset_all_windows()
+                self.window_manager.reset_bindings()
+                child.configure(style="TButton", text="Apply config")
+                self.app.info_label['text'] = f""
+                self.app.aot_button.configure(style='Disabled.TButton', state=tk.DISABLED)
+                self.stop_auto_reapply()
+
+        if self.applied_rules:
+            # A recent snapshot is waited for off the Tk thread
+            rules = self.applied_rules
+            self.window_manager.request_snapshot(
+                lambda snapshot: self.dispatcher.post(self.apply_matching_windows, rules, snapshot, key="apply"))
+
+        self.update_always_on_top_status()
+
+    def apply_matching_windows(self, rules, snapshot):
+        # The config was reset or replaced while waiting for the snapshot
+        if not rules or rules is not self.applied_rules:
+            return
+
+        matching_windows, _ = self.window_manager.find_matching_windows(rules, snapshot, sticky=True)
+        self.cancel_pending_apply()
+        self.window_manager.reset_all_windows()
+
+        # Apply configuration, the windows are waited for off the Tk thread
+        placements = [(match['hwnd'], match['rule']) for match in matching_windows]
+        pending = self.pending_apply = self.window_manager.start_apply(placements)
+        self.applied_matches = matching_windows
+        threading.Thread(target=self.wait_apply, args=(rules, matching_windows, pending), daemon=True).start()
+
+    def wait_apply(self, rules, matching_windows, pending):
+        # Runs on a worker thread
+        self.window_manager.wait_apply(pending)
+        self.dispatcher.post(self.finish_apply, rules, matching_windows, pending)
+
+    def cancel_pending_apply(self):
+        # Workers stop before their next step, the windows are not committed
+        if self.pending_apply:
+            self.pending_apply.cancelled.set()
+            self.pending_apply = None
+
+    def finish_apply(self, rules, matching_windows, pending):
+        # The config was reset or applied again while the windows were prepared
+        if pending is not self.pending_apply or rules is not self.applied_rules:
+            return
+        self.pending_apply = None
+        result = self.window_manager.finish_apply(pending)
+        print(f"Applied {len(pending.placements)} windows in {result.total_ms:.0f} ms (commit {result.commit_ms:.0f} ms)")
+
+        unresponsive = result.unresponsive
+        skipped = [match['config_name'] for match in matching_windows if match['hwnd'] in unresponsive]
+        if skipped:
+            self.app.info_label['text'] = f"Not responding, skipped: {', '.join(skipped)}"
+        self.watch_matches(matching_windows)
         self.update_always_on_top_status()
 
     def create_config(self):
+        self.window_manager.request_snapshot(lambda snapshot: self.dispatcher.post(self.show_create_config, snapshot))
+
+    def show_create_config(self, snapshot):
         self.app.create_config_ui(self.app.root,
-            self.window_manager.get_all_window_titles(),
+            self.window_manager.get_all_window_titles(snapshot),
             self.config_manager.save_window_config,
-            self.config_manager.collect_window_settings,
+            # Read when the selection is confirmed, not when the dialog was opened
+            lambda title: self.config_manager.collect_window_settings(title, self.window_manager.current_snapshot()),
             self.update_config_list
         )
 
@@ -128,30 +182,39 @@ class ApplicationState:
         for hwnd in self.window_manager.topmost_windows:
             self.window_manager.toggle_always_on_top(hwnd)
         self.update_always_on_top_status()
-        self.app.reapply.set(0)
+        self.stop_auto_reapply()
     
     def on_config_select(self, event):
         selected_value = event.widget.get()
         if selected_value in self.config_names:
             idx = self.config_names.index(selected_value)
             selected_config = self.config_files[idx]
-            loaded_config = self.config_manager.load_config(selected_config)
-            self.config = self.config_manager.validate_and_repair_config(loaded_config)
-            _, missing_windows = self.window_manager.find_matching_windows(self.config)
+            self.rules = self.config_manager.load_rules(selected_config)
+            # Titles of the selected config jump the queue of a running download
+            downloader = self.downloader
+            if downloader:
+                downloader.prioritize(self.rule_titles(self.rules))
+            _, missing_windows = self.window_manager.find_matching_windows(self.rules)
             if not self.app.compact_mode:
-                self.compute_window_layout(self.config, missing_windows)
+                self.compute_window_layout(self.rules, missing_windows)
             else:
-                self.update_managed_windows_list(self.config)
+                self.update_managed_windows_list(self.rules)
+            self.update_config_cache_stats()
+
+    def update_config_cache_stats(self):
+        # Scrolling through configs already loaded should only add hits
+        stats = self.config_manager.cache_stats()
+        self.app.config_cache_label['text'] = f"Config cache: {stats['hits']} hits, {stats['misses']} misses"
 
     def toggle_compact_mode(self=None, startup=False):
         self.app.toggle_compact(startup)
         self.compact = self.app.compact_mode
         self.save_settings()
         if self.app.compact_mode:
-            self.update_managed_windows_list(self.config)
+            self.update_managed_windows_list(self.rules)
         else:
-            _, missing_windows = self.window_manager.find_matching_windows(self.config)
-            self.compute_window_layout(self.config, missing_windows)
+            _, missing_windows = self.window_manager.find_matching_windows(self.rules)
+            self.compute_window_layout(self.rules, missing_windows)
 
     def delete_config(self):
         current_name = self.app.combo_box.get().strip()
@@ -163,7 +226,9 @@ class ApplicationState:
         if confirm:
             deleted = self.config_manager.delete_config(current_name)
             if deleted:
-                self.update_config_list()
+                self.remove_config_entry(f"config_{current_name}.ini")
+                self.app.combo_box['values'] = self.config_names
+                self.select_config()
             else:
                 messagebox.showerror("Error", f"Failed to delete '{current_name}'.")
 
@@ -176,7 +241,8 @@ class ApplicationState:
             print(f"Can't open image folder: {e}")
 
     def download_screenshots_threaded(self):
-        threading.Thread(target=self.download_screenshots, daemon=True).start()
+        self.app.image_download_button.config(state='disabled', style='Disabled.TButton')
+        threading.Thread(target=self.download_screenshots, args=(self.rule_titles(self.rules),), daemon=True).start()
                         
     def toggle_images(self):
         self.app.use_images = not self.app.use_images
@@ -187,63 +253,118 @@ class ApplicationState:
                 child.configure(style="TButton", text="Toggle images")
 
         self.save_settings()
-        _, missing_windows = self.window_manager.find_matching_windows(self.config)
-        self.compute_window_layout(self.config, missing_windows)
+        _, missing_windows = self.window_manager.find_matching_windows(self.rules)
+        self.compute_window_layout(self.rules, missing_windows)
 
     def start_auto_reapply(self):
-        if self.app.reapply.get():
+        if not self.app.reapply.get():
+            self.window_watcher.stop()
+            self.update_reapply_stats()
+            return
+
+        self.watch_matches(self.applied_matches)
+        self.auto_reapply()
+        self.refresh_reapply_stats()
+        if not self.window_watcher.start():
+            # Window event hooks unavailable, fall back to polling
+            self.poll_auto_reapply()
+
+    def stop_auto_reapply(self):
+        self.app.reapply.set(0)
+        self.window_watcher.stop()
+        self.update_reapply_stats()
+
+    def poll_auto_reapply(self):
+        if self.app.reapply.get() and not self.window_watcher.running:
             self.auto_reapply()
-        self.app.root.after(500, self.start_auto_reapply)
+            self.app.root.after(ReapplyDefaults.POLL_INTERVAL_MS, self.poll_auto_reapply)
+
+    def on_window_events(self, dirty_hwnds, topology_changed):
+        # Called from the watcher thread, which only hands the events over so it keeps pumping hook messages.
+        # New windows are matched once a snapshot including them is published.
+        if topology_changed:
+            self.window_manager.request_snapshot(
+                lambda snapshot: self.dispatcher.post(self.auto_reapply, dirty_hwnds, True), max_age_ms=0)
+        else:
+            self.dispatcher.post(self.auto_reapply, dirty_hwnds, False)
+
+    def on_snapshot_published(self, snapshot):
+        # Called from the snapshot service thread
+        self.dispatcher.post(self.refresh_missing_windows, key="refresh_missing_windows")
+
+    def refresh_missing_windows(self):
+        # Windows opened or closed since the preview was drawn
+        if not self.window_manager or not self.rules or self.app.compact_mode:
+            return
+        _, missing_windows = self.window_manager.find_matching_windows(self.rules)
+        if set(missing_windows) != self.shown_missing:
+            self.compute_window_layout(self.rules, missing_windows)
+
+    def watch_matches(self, matching_windows):
+        # Watches the matched windows, and new windows only while a section of the applied config has none
+        matched = {match['config_name'] for match in matching_windows}
+        pending = [rule.matcher for rule in self.applied_rules or () if rule.section not in matched]
+        self.window_watcher.watch((match['hwnd'] for match in matching_windows), pending)
 
 ######################
 
-    def compare_window_data(self, settings, metrics):
-        differences = []
-        
-        settings_pos = tuple(map(int, settings['position'].split(','))) if settings['position'] else (0, 0)
-        if settings_pos != metrics['position']:
-            differences.append(f"Position mismatch: Settings={settings_pos}, Metrics={metrics['position']}")
-        
-        settings_size = tuple(map(int, settings['size'].split(','))) if settings['size'] else (0, 0)
-        if settings_size != metrics['size']:
-            differences.append(f"Size mismatch: Settings={settings_size}, Metrics={metrics['size']}")
-        
-        settings_aot = settings['always_on_top'] == True
-        metrics_aot = (metrics['exstyle'] & 0x00000008) != 0
-        if settings_aot != metrics_aot:
-            differences.append(f"Always on top mismatch: Settings={settings_aot}, Metrics={metrics_aot}")
-        
-        settings_titlebar = settings['has_titlebar'] == True
-        metrics_titlebar = (metrics['style'] & 0x00C00000) != 0
-        if settings_titlebar != metrics_titlebar:
-            differences.append(f"Titlebar mismatch: Settings={settings_titlebar}, Metrics={metrics_titlebar}")
-        
-        if not differences:
-            return True
-        
-        #print("\n".join(differences))
-        return False
+    def auto_reapply(self, dirty_hwnds=None, topology_changed=False):
+        if self.app.reapply.get() and self.applied_rules:
+            if dirty_hwnds is None or topology_changed:
+                matching_windows, _ = self.window_manager.find_matching_windows(self.applied_rules, sticky=True)
+                self.applied_matches = matching_windows
+                self.watch_matches(matching_windows)
+            else:
+                # Only windows that reported a change need to be checked
+                matching_windows = [match for match in self.applied_matches if match['hwnd'] in dirty_hwnds]
 
-    def auto_reapply(self):
-        if self.app.reapply.get():
-            matching_windows, _ = self.window_manager.find_matching_windows(self.applied_config)
-            compare_results = []
+            drifted_windows = []
             for match in matching_windows:
                 hwnd = match['hwnd']
-                section = match['config_name']
-                
-                # Get window settings from config
-                settings = {
-                    'position': self.applied_config.get(section, 'position', fallback=None),
-                    'size': self.applied_config.get(section, 'size', fallback=None),
-                    'always_on_top': self.applied_config.getboolean(section, 'always_on_top', fallback=False),
-                    'has_titlebar': self.applied_config.getboolean(section, 'titlebar', fallback=True)
-                }
-
                 metrics = self.window_manager.get_window_metrics(hwnd)
-                compare_results.append(self.compare_window_data(settings, metrics))
-            if not all(compare_results):
-                self.apply_settings(reapply=True)
+                if not metrics:
+                    continue
+                drift = self.window_manager.compare_window_data(hwnd, match['rule'], metrics)
+                if drift:
+                    drifted_windows.append((hwnd, drift))
+
+            # Only the drifted properties are fixed, the other windows are left untouched
+            if drifted_windows:
+                self.window_manager.reconcile_windows(drifted_windows)
+                self.update_always_on_top_status()
+
+            sections = {match['hwnd']: match['config_name'] for match in matching_windows}
+            for hwnd, prop in self.window_manager.pop_unconverged():
+                section = sections.get(hwnd, hwnd)
+                print(f"Stopped re-applying {prop} for {section}, the window keeps rejecting it")
+                self.app.info_label['text'] = f"{section} does not accept its configured {prop.replace('_', ' ')}"
+
+            self.update_reapply_stats()
+
+    def update_reapply_stats(self):
+        if not self.app.reapply.get():
+            self.app.reapply_stats_label['text'] = ""
+            return
+
+        text = f"Re-applies: {self.window_manager.reapplies_per_minute()}/min"
+        hit_rate = self.window_manager.binding_hit_rate()
+        if hit_rate is not None:
+            text += (f"  Bindings: {hit_rate:.0%} hit, {self.window_manager.rebinds} re-bound, "
+                     f"{self.window_manager.renamed} renamed")
+        unconverged = len(self.window_manager.unconverged)
+        if unconverged:
+            text += f"  Not converging: {unconverged}"
+        self.app.reapply_stats_label['text'] = text
+
+    def refresh_reapply_stats(self):
+        # The re-apply rate decays without window events, keep the label current while enabled.
+        # Toggling re-apply again restarts the refresh instead of adding another one.
+        if self.reapply_stats_job:
+            self.app.root.after_cancel(self.reapply_stats_job)
+            self.reapply_stats_job = None
+        self.update_reapply_stats()
+        if self.app.reapply.get():
+            self.reapply_stats_job = self.app.root.after(ReapplyDefaults.STATS_REFRESH_MS, self.refresh_reapply_stats)
 
     def check_igdb_client_info(self):
         for module_name in ("lib.client_secrets", "client_secrets"):
@@ -257,44 +378,112 @@ class ApplicationState:
             except ModuleNotFoundError:
                 continue
 
-    def download_screenshots(self):
-            self.app.image_download_button.config(state='disabled', style='Disabled.TButton')
+    def download_screenshots(self, selected_titles):
+            # Runs on a worker thread, the GUI is only updated through the dispatcher
             # List to hold all titles
             search_titles = set()
 
             # Getting the titles from all config files
             config_files, _ = self.config_manager.list_config_files()
             for config_file in config_files:
-                config = self.config_manager.load_config(config_file)
-                if not config:
-                    continue
-
-                for section in config.sections():
-                    title = config[section].get("search_title", fallback=section)
-                    cleaned_title = clean_window_title(title, sanitize=True)
-                    # Adding title to list
-                    search_titles.add(cleaned_title)
-            
-            # Downloading screenshots for all titles
-            for title in search_titles:
-                filename = title.replace(' ', '_').replace(':', '')
-                image_path = os.path.join(self.assets_dir, f"{filename}.jpg")
-
-                if not os.path.exists(image_path):
-                    self.asset_manager.search(title, save_dir=self.assets_dir)
-                    if self.app.info_label.winfo_exists():
-                        self.app.info_label['text'] = f"Downloading image for {title}"
+                search_titles.update(self.rule_titles(self.config_manager.load_rules(config_file)))
+
+            # Titles without an asset are searched in batches, the selected config first
+            asset_index = get_asset_index(self.assets_dir)
+            asset_index.loaded.wait()
+            # Dummy files of earlier versions are searched again, misses are now kept in the response cache
+            missing_titles = sorted((title for title in search_titles
+                                     if not asset_index.lookup(title) or asset_index.lookup(title).is_dummy),
+                                    key=lambda title: (title not in selected_titles, title))
+            if missing_titles:
+                self.dispatcher.post(self.set_info_text, f"Searching images for {len(missing_titles)} titles", key="info")
+            try:
+                matches = self.asset_manager.resolve_titles(missing_titles)
+            except Exception as e:
+                print(f"Image search failed: {e}")
+                matches = {}
+
+            # Downloading the screenshots
+            downloader = DownloadScheduler(
+                lambda title: self.asset_manager.save_result(title, matches[title], save_dir=self.assets_dir),
+                on_progress=self.on_download_progress
+            )
+            # Only titles with a match are downloaded, a miss is remembered in the response cache
+            downloader.submit(title for title in missing_titles if matches.get(title) is not None)
+            downloader.prioritize(selected_titles)
+            self.downloader = downloader
+            try:
+                done, failed = downloader.run()
+            finally:
+                self.downloader = None
+            no_match = sum(1 for title in missing_titles if title in matches and matches[title] is None)
+            # Titles whose search failed were never queued
+            failed += sum(1 for title in missing_titles if title not in matches)
+            self.dispatcher.post(self.finish_download, failed, no_match)
+
+    def finish_download(self, failed, no_match):
+        _, missing_windows = self.window_manager.find_matching_windows(self.rules)
+        if not self.compact:
+            self.compute_window_layout(self.rules, missing_windows)
+            text = "Image download complete"
+            if failed:
+                text += f", {failed} failed"
+            if no_match:
+                text += f", {no_match} without a match"
+            self.set_info_text(text)
+
+        self.app.image_download_button.config(state='enabled', style='TButton')
+
+    def set_info_text(self, text):
+        if self.app.info_label.winfo_exists():
+            self.app.info_label['text'] = text
+
+    @staticmethod
+    def rule_titles(rules):
+        return {clean_window_title(rule.search_title, sanitize=True) for rule in rules or ()}
+
+    def on_download_progress(self, done, failed, total, title):
+        # Called from the download worker threads, only the latest count is shown
+        text = f"Downloading images: {done + failed}/{total}"
+        if failed:
+            text += f" ({failed} failed)"
+        self.dispatcher.post(self.set_info_text, text, key="info")
+
+    def load_assets(self):
+        # Indexes the assets folder, then keeps the index current and builds missing thumbnails
+        get_asset_index(self.assets_dir).load()
+        self.dispatcher.post(self.refresh_layout_images, key="refresh_layout_images")
+
+        self.asset_watcher = DirectoryWatcher(self.assets_dir, self.on_asset_files_changed, name_filter=AssetIndex.is_asset_file)
+        self.asset_watcher.start()
+        self.migrate_thumbnails()
+
+    def on_asset_files_changed(self, changes):
+        # Called from the assets folder watcher thread
+        get_asset_index(self.assets_dir).apply_changes(changes)
+        thumbnail_store = get_thumbnail_store(self.assets_dir)
+        for filename, action in changes.items():
+            if action == REMOVED:
+                thumbnail_store.remove(filename)
+            else:
+                thumbnail_store.refresh(os.path.join(self.assets_dir, filename))
+        self.dispatcher.post(self.refresh_layout_images, key="refresh_layout_images")
 
-            _, missing_windows = self.window_manager.find_matching_windows(self.config)
-            if not self.compact:
-                self.compute_window_layout(self.config, missing_windows)
-                if self.app.info_label.winfo_exists():
-                    self.app.info_label['text'] = f"Image download complete"
+    def refresh_layout_images(self):
+        if self.app.use_images and self.app.layout_frame and self.app.layout_frame.winfo_exists():
+            self.app.layout_frame.redraw()
 
-            self.app.image_download_button.config(state='enabled', style='TButton')
+    def migrate_thumbnails(self):
+        # Builds the pre-scaled variants for assets stored before they existed
+        try:
+            migrated = get_thumbnail_store(self.assets_dir).migrate()
+            if migrated:
+                print(f"Created thumbnails for {migrated} assets")
+        except Exception as e:
+            print(f"Thumbnail migration failed: {e}")
 
     def take_screenshot(self):
-        existing_windows, _ = self.window_manager.find_matching_windows(self.config)
+        existing_windows, _ = self.window_manager.find_matching_windows(self.rules)
         if existing_windows:
             for window in existing_windows:
                 hwnd = window['hwnd']
@@ -311,16 +500,16 @@ class ApplicationState:
         except Exception as e:
             print(f"Error updating always-on-top status: {e}")
 
-    def update_managed_windows_list(self, config):
+    def update_managed_windows_list(self, rules):
         if not hasattr(self.app, 'managed_text'):
             self.app.setup_managed_text()  # Ensure widgets exist
 
         lines = []
         aot_lines = []
-        if config:
-            for section in config.sections():
-                is_aot = config.getboolean(section, "always_on_top", fallback=False)
-                title = f"* {section} *" if is_aot else section
+        if rules:
+            for rule in rules:
+                is_aot = rule.always_on_top
+                title = f"* {rule.section} *" if is_aot else rule.section
                 if len(title) > UIConstants.WINDOW_TITLE_MAX_LENGTH:
                     title = title[:UIConstants.WINDOW_TITLE_MAX_LENGTH] + "..."
                 lines.append(title)
@@ -328,50 +517,127 @@ class ApplicationState:
 
         self.app.update_managed_text(lines, aot_lines)
 
-    def compute_window_layout(self, config, missing_windows):
+    def compute_window_layout(self, rules, missing_windows):
         positioned_windows = []
-
-        if config:
-            for section in config.sections():
-                pos = config[section].get("position")
-                size = config[section].get("size")
-                
-                if pos and size:
-                    pos_x, pos_y = map(int, pos.split(','))
-                    size_w, size_h = map(int, size.split(','))
-                    always_on_top = config[section].get("always_on_top", "false").lower() == "true"
-                    window_exists = section not in missing_windows
-                    search_title = config[section].get("search_title") or section
-                    positioned_windows.append(WindowInfo(section,
+        self.shown_missing = set(missing_windows)
+
+        if rules:
+            for rule in rules:
+                if rule.position and rule.size:
+                    pos_x, pos_y = rule.position
+                    size_w, size_h = rule.size
+                    window_exists = rule.section not in missing_windows
+                    positioned_windows.append(WindowInfo(rule.section,
                                                          pos_x, pos_y,
                                                          size_w, size_h,
-                                                         always_on_top,
+                                                         rule.always_on_top,
                                                          window_exists,
-                                                         search_title
+                                                         rule.search_title
                                                          ))
 
             self.app.set_layout_frame(positioned_windows)
 
     def update_config_list(self, config=None):
-        self.config_files, self.config_names = self.config_manager.list_config_files()
+        if config and self.config_files:
+            # A single config was saved, the watcher keeps the rest of the list current
+            self.add_config_entry(f"config_{config}.ini")
+        else:
+            self.config_files, self.config_names = self.config_manager.list_config_files()
+        self.app.combo_box['values'] = self.config_names
+        self.select_config(config)
+
+    def select_config(self, config=None):
         if self.config_files and self.config_names:
-            self.app.combo_box['values'] = self.config_names
-            self.app.combo_box.set(config or self.config_names[0])
+            self.app.combo_box.set(config if config in self.config_names else self.config_names[0])
             self.app.combo_box.event_generate("<<ComboboxSelected>>")
         else:
-            self.app.combo_box['values'] = []
             self.app.combo_box.set('')
             if self.app.layout_frame:
                 self.app.layout_frame.destroy()
 
+    def add_config_entry(self, config_file):
+        if config_file in self.config_files:
+            return False
+        if not os.path.exists(os.path.join(self.config_dir, config_file)):
+            return False
+        index = bisect.bisect_left(self.config_files, config_file)
+        self.config_files.insert(index, config_file)
+        self.config_names.insert(index, ConfigManager.config_name(config_file))
+        return True
+
+    def remove_config_entry(self, config_file):
+        index = bisect.bisect_left(self.config_files, config_file)
+        if index < len(self.config_files) and self.config_files[index] == config_file:
+            del self.config_files[index]
+            del self.config_names[index]
+            return True
+        return False
+
+    def on_config_files_changed(self, changes):
+        # Called from the config folder watcher thread
+        self.dispatcher.post(self.apply_config_changes, changes)
+
+    def apply_config_changes(self, changes):
+        selected = self.app.combo_box.get()
+        selection_changed = False
+        list_changed = False
+
+        for config_file, action in changes.items():
+            self.config_manager.invalidate_config(config_file)
+            if action == REMOVED:
+                list_changed |= self.remove_config_entry(config_file)
+            else:
+                list_changed |= self.add_config_entry(config_file)
+                # Only the changed file is parsed and validated again
+                self.config_manager.load_rules(config_file)
+            selection_changed |= ConfigManager.config_name(config_file) == selected
+
+        if list_changed:
+            self.app.combo_box['values'] = self.config_names
+        if selection_changed or not selected:
+            self.select_config(selected)
+
     def save_settings(self):
         self.config_manager.save_settings(self.compact, self.app.use_images, self.app.snap.get())
 
     def load_managers(self):
-        # Checking if the IGDB client info is added
-        state.check_igdb_client_info()
-        state.window_manager = WindowManager()
-        state.asset_manager = AssetManager(client_id=self.CLIENT_ID, client_secret=self.CLIENT_SECRET, client_info_missing=self.client_info_missing)
+        # Runs on a background thread, the managers are handed over on the Tk thread
+        try:
+            # Checking if the IGDB client info is added
+            self.check_igdb_client_info()
+            snapshot_service = WindowSnapshotService(on_publish=self.on_snapshot_published)
+            snapshot_service.start()
+            window_manager = WindowManager(snapshot_service=snapshot_service)
+            window_watcher = WindowEventWatcher(on_change=self.on_window_events)
+            token_path = os.path.join(self.config_manager.base_path, IgdbDefaults.TOKEN_FILE)
+            cache_path = os.path.join(self.config_manager.base_path, IgdbDefaults.CACHE_FILE)
+            asset_manager = AssetManager(client_id=self.CLIENT_ID, client_secret=self.CLIENT_SECRET, client_info_missing=self.client_info_missing, token_path=token_path, cache_path=cache_path)
+        except Exception as e:
+            print(f"Failed to load managers: {e}")
+            self.managers_ready.set_exception(e)
+            return
+        self.dispatcher.post(self.set_managers, snapshot_service, window_manager, window_watcher, asset_manager)
+
+    def set_managers(self, snapshot_service, window_manager, window_watcher, asset_manager):
+        self.snapshot_service = snapshot_service
+        self.window_manager = window_manager
+        self.window_watcher = window_watcher
+        self.asset_manager = asset_manager
+        self.managers_ready.set_result(True)
+
+    def when_ready(self, func, *args):
+        # Runs func on the Tk thread once the managers are loaded
+        def run(future):
+            if future.exception() is None:
+                self.dispatcher.post(func, *args)
+        self.managers_ready.add_done_callback(run)
+
+    def finish_startup(self, default_config):
+        self.update_config_list(default_config)
+
+        # Keep the config list in sync with files edited outside the application
+        self.config_watcher = DirectoryWatcher(self.config_dir, self.on_config_files_changed, name_filter=ConfigManager.is_config_file)
+        self.config_watcher.start()
 
 
 def load_tk_GUI():
@@ -396,16 +662,22 @@ def load_tk_GUI():
     app = TkGUIManager(root, callbacks=callbacks, compact=state.compact, is_admin=state.is_admin, use_images=state.use_images, snap=state.snap_side, client_info_missing=state.client_info_missing)
     state.app = app
     state.app.assets_dir = state.assets_dir
+    state.dispatcher.attach(root)
 
     # Set default config
     if state.compact: state.toggle_compact_mode(startup=True)
     default_config = state.config_manager.detect_default_config()
-    state.update_config_list(default_config)
+    state.when_ready(state.finish_startup, default_config)
+
+    threading.Thread(target=state.load_assets, daemon=True).start()
 
     # Start main GUI
     state.app.root.mainloop()
 
 if __name__ == "__main__":
+    # Thumbnail migration uses a process pool, which needs this in the frozen .exe
+    multiprocessing.freeze_support()
+
     # Get application base path
     # Needed to make the application work the same when running as script as well as .exe
     if getattr(sys, 'frozen', False):
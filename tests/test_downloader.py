@@ -0,0 +1,260 @@
+import io
+import os
+import json
+import time
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local imports
+from lib.downloader import DownloadScheduler, RateLimiter, RetryableError, retry
+
+try:
+    from PIL import Image
+    from lib.asset_manager import AssetManager
+except ImportError:
+    # Needs the Windows dependencies of the application
+    AssetManager = None
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Queries of the recorded multiquery response, in sub-query order
+QUERIES = ["Diablo IV", "counter-strike 2", "Path of Exile", "Unknown Title"]
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def jpeg_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 36), (40, 80, 120)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Stands in for the token endpoint, the IGDB API and the image host.
+    # Each path answers with the next status scripted for it, 200 once the script is used up.
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        status = self.record()
+        path = self.path.split('?')[0].lstrip('/')
+        if status != 200:
+            self.reply(status, b"error")
+        elif path == "token":
+            self.reply(200, json.dumps({"access_token": "stub-token", "expires_in": 3600}).encode())
+        elif path == "v4/multiquery":
+            self.reply(200, json.dumps(load_fixture("igdb_multiquery.json")).encode())
+        elif path == "v4/screenshots":
+            # Screenshots are served by this server instead of the IGDB image host
+            screenshots = load_fixture("igdb_screenshots.json")
+            for screenshot in screenshots:
+                screenshot['url'] = screenshot['url'].replace("//images.igdb.com/", self.server.base_url)
+            self.reply(200, json.dumps(screenshots).encode())
+        else:
+            self.reply(404, body)
+
+    def do_GET(self):
+        status = self.record()
+        self.reply(status, self.server.image if status == 200 else b"error")
+
+    def record(self):
+        server = self.server
+        path = self.path.split('?')[0].lstrip('/')
+        with server.lock:
+            server.requests.append((self.command, path, time.monotonic()))
+            statuses = server.scripts.get(path, [])
+            return statuses.pop(0) if statuses else 200
+
+    def reply(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@unittest.skipIf(AssetManager is None, "application dependencies not installed")
+class StubServerTest(unittest.TestCase):
+    # Runs the application's AssetManager against a local stub server
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.scripts = {}
+        self.server.image = jpeg_bytes()
+        self.server.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+        self.assets_dir = tempfile.TemporaryDirectory()
+        self.manager = AssetManager(client_id="client", client_secret="secret", client_info_missing=False,
+                                    api_url=self.server.base_url + "v4", auth_url=self.server.base_url + "token")
+
+    def tearDown(self):
+        self.manager.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.assets_dir.cleanup()
+
+    def script(self, path, *statuses):
+        self.server.scripts[path] = list(statuses)
+
+    def requested(self, path=None, command=None):
+        return [requested for requested_command, requested, _ in self.server.requests
+                if (path is None or requested == path) and (command is None or requested_command == command)]
+
+    def image_path(self, title):
+        return f"images/{title}.jpg"
+
+    def matches(self, titles):
+        # Resolved lookups as returned by resolve_titles, each pointing to its own image on the stub server
+        return {title: (title, self.server.base_url + self.image_path(title)) for title in titles}
+
+    def scheduler(self, matches, **kwargs):
+        # Downloads with the fetch the application runs
+        kwargs.setdefault("backoff", 0.01)
+        return DownloadScheduler(
+            lambda title: self.manager.save_result(title, matches[title], save_dir=self.assets_dir.name),
+            **kwargs
+        )
+
+    def saved(self, title):
+        return os.path.exists(os.path.join(self.assets_dir.name, f"{title}.jpg"))
+
+
+class DownloadSchedulerTest(StubServerTest):
+    def test_downloads_every_title(self):
+        titles = [f"title{index}" for index in range(10)]
+        scheduler = self.scheduler(self.matches(titles))
+        scheduler.submit(titles)
+        self.assertEqual(scheduler.run(), (10, 0))
+        self.assertEqual(sorted(self.requested(command="GET")), sorted(map(self.image_path, titles)))
+        self.assertTrue(all(map(self.saved, titles)))
+
+    def test_duplicate_titles_are_downloaded_once(self):
+        scheduler = self.scheduler(self.matches(["a", "b"]))
+        scheduler.submit(["a", "a", "b"])
+        scheduler.submit(["b"])
+        self.assertEqual(scheduler.run(), (2, 0))
+        self.assertEqual(len(self.requested(command="GET")), 2)
+
+    def test_retries_rate_limited_and_server_errors(self):
+        self.script(self.image_path("a"), 429, 503)
+        scheduler = self.scheduler(self.matches(["a"]), max_retries=3)
+        scheduler.submit(["a"])
+        self.assertEqual(scheduler.run(), (1, 0))
+        self.assertEqual(len(self.requested(self.image_path("a"))), 3)
+
+    def test_gives_up_after_max_retries(self):
+        self.script(self.image_path("a"), 503, 503, 503, 503)
+        scheduler = self.scheduler(self.matches(["a", "b"]), max_retries=2)
+        scheduler.submit(["a", "b"])
+        self.assertEqual(scheduler.run(), (1, 1))
+        self.assertEqual(len(self.requested(self.image_path("a"))), 3)
+
+    def test_client_errors_are_not_retried(self):
+        self.script(self.image_path("a"), 404)
+        scheduler = self.scheduler(self.matches(["a"]), max_retries=3)
+        scheduler.submit(["a"])
+        self.assertEqual(scheduler.run(), (0, 1))
+        self.assertEqual(len(self.requested(self.image_path("a"))), 1)
+        self.assertFalse(self.saved("a"))
+
+    def test_titles_without_match_fail(self):
+        scheduler = self.scheduler({"a": None, "b": None})
+        scheduler.submit(["a", "b"])
+        self.assertEqual(scheduler.run(), (0, 2))
+        self.assertEqual(self.requested(), [])
+
+    def test_undecodable_images_fail(self):
+        self.server.image = b"not an image"
+        scheduler = self.scheduler(self.matches(["a"]))
+        scheduler.submit(["a"])
+        self.assertEqual(scheduler.run(), (0, 1))
+
+    def test_prioritized_titles_jump_the_queue(self):
+        scheduler = self.scheduler(self.matches(["a", "b", "c", "d"]), workers=1)
+        scheduler.submit(["a", "b", "c", "d"])
+        scheduler.prioritize(["d", "c"])
+        scheduler.run()
+        self.assertEqual(self.requested(), list(map(self.image_path, ["d", "c", "a", "b"])))
+
+    def test_reports_progress_counts(self):
+        self.script(self.image_path("b"), 404)
+        progress = []
+        scheduler = self.scheduler(self.matches(["a", "b", "c"]), workers=1,
+                                   on_progress=lambda *args: progress.append(args))
+        scheduler.submit(["a", "b", "c"])
+        scheduler.run()
+        self.assertEqual(progress, [(1, 0, 3, "a"), (1, 1, 3, "b"), (2, 1, 3, "c")])
+
+    def test_cancel_stops_the_workers(self):
+        scheduler = self.scheduler(self.matches(["a", "b", "c"]), workers=1)
+        scheduler.submit(["a", "b", "c"])
+        fetch = scheduler.fetch
+        scheduler.fetch = lambda title: (scheduler.cancel(), fetch(title))[1]
+        scheduler.run()
+        self.assertEqual(self.requested(), [self.image_path("a")])
+
+    def test_resolves_and_downloads_screenshots(self):
+        matches = self.manager.resolve_titles(QUERIES)
+        scheduler = self.scheduler(matches)
+        scheduler.submit(title for title in QUERIES if matches.get(title))
+        self.assertEqual(scheduler.run(), (2, 0))
+        self.assertEqual(self.requested("token"), ["token"])
+        self.assertEqual(sorted(self.requested(command="GET")), [
+            "igdb/image/upload/t_1080p/sc7p3m.jpg",
+            "igdb/image/upload/t_1080p/sclp5f.jpg",
+        ])
+        self.assertTrue(self.saved("Diablo_IV"))
+        self.assertTrue(self.saved("Counter-Strike_2"))
+
+
+class RateLimiterTest(StubServerTest):
+    def test_spaces_requests_across_workers(self):
+        self.manager.rate_limiter = RateLimiter(rate=20)
+        scheduler = DownloadScheduler(lambda title: self.manager.search_games([title]), workers=4, backoff=0.01)
+        scheduler.submit(f"title{index}" for index in range(10))
+        scheduler.run()
+        times = sorted(started for _, path, started in self.server.requests if path == "v4/multiquery")
+        # 10 requests at 20 per second start at least 9 intervals apart
+        self.assertEqual(len(times), 10)
+        self.assertGreaterEqual(times[-1] - times[0], 9 / 20 - 0.05)
+
+
+class RetryTest(unittest.TestCase):
+    def test_returns_first_success(self):
+        attempts = []
+        def func():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise RetryableError("busy")
+            return "ok"
+        self.assertEqual(retry(func, max_retries=3, backoff=0.001), "ok")
+        self.assertEqual(len(attempts), 3)
+
+    def test_cancelled_retry_raises_without_waiting(self):
+        cancelled = threading.Event()
+        cancelled.set()
+        def func():
+            raise RetryableError("busy")
+        start = time.monotonic()
+        with self.assertRaises(RetryableError):
+            retry(func, max_retries=5, backoff=10, cancelled=cancelled)
+        self.assertLess(time.monotonic() - start, 1)
+
+
+class FalsyFetchTest(unittest.TestCase):
+    def test_false_result_counts_as_failed(self):
+        scheduler = DownloadScheduler(lambda title: False)
+        scheduler.submit(["a", "b"])
+        self.assertEqual(scheduler.run(), (0, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
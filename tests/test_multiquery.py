@@ -0,0 +1,95 @@
+import os
+import json
+import unittest
+
+try:
+    from lib.asset_manager import AssetManager
+except ImportError:
+    # Needs the Windows dependencies of the application
+    AssetManager = None
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Queries of the recorded multiquery response, in sub-query order
+QUERIES = ["Diablo IV", "counter-strike 2", "Path of Exile", "Unknown Title"]
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class RecordedResponse:
+    def __init__(self, data, status_code=200):
+        self.data = data
+        self.status_code = status_code
+        self.text = json.dumps(data)
+
+    def json(self):
+        return self.data
+
+
+if AssetManager is not None:
+    class RecordedAssetManager(AssetManager):
+        # Answers API requests from the recorded responses instead of IGDB
+        def __init__(self):
+            super().__init__(client_id="client", client_secret="secret", client_info_missing=False)
+            self.requests = []
+
+        def post(self, endpoint, body):
+            self.requests.append((endpoint, body))
+            if endpoint == 'multiquery':
+                return RecordedResponse(load_fixture("igdb_multiquery.json"))
+            if endpoint == 'screenshots':
+                return RecordedResponse(load_fixture("igdb_screenshots.json"))
+            return RecordedResponse([], status_code=404)
+
+
+@unittest.skipIf(AssetManager is None, "application dependencies not installed")
+class MatchGamesTest(unittest.TestCase):
+    def setUp(self):
+        self.matches = AssetManager.match_games(QUERIES, load_fixture("igdb_multiquery.json"))
+
+    def test_exact_title_is_preferred_over_longer_names(self):
+        self.assertEqual(self.matches["Diablo IV"]["id"], 125165)
+
+    def test_title_case_is_ignored(self):
+        self.assertEqual(self.matches["counter-strike 2"]["name"], "Counter-Strike 2")
+
+    def test_similar_names_and_matches_without_screenshots_are_no_match(self):
+        self.assertIsNone(self.matches["Path of Exile"])
+
+    def test_title_without_results_is_no_match(self):
+        self.assertIsNone(self.matches["Unknown Title"])
+
+    def test_entries_of_unknown_sub_queries_are_ignored(self):
+        response = load_fixture("igdb_multiquery.json") + [{"name": "9", "result": []}, {"result": []}]
+        self.assertEqual(AssetManager.match_games(QUERIES, response), self.matches)
+
+    def test_build_multiquery_names_sub_queries_by_position(self):
+        body = AssetManager.build_multiquery(['Say "Hi"', "Back\\slash"])
+        self.assertIn('query games "0"', body)
+        self.assertIn('search "Say \\"Hi\\"";', body)
+        self.assertIn('query games "1"', body)
+        self.assertIn('search "Back\\\\slash";', body)
+
+
+@unittest.skipIf(AssetManager is None, "application dependencies not installed")
+class ResolveTitlesTest(unittest.TestCase):
+    def test_resolves_titles_with_one_multiquery_and_one_screenshot_query(self):
+        manager = RecordedAssetManager()
+        results = manager.resolve_titles(QUERIES)
+
+        self.assertEqual(results, {
+            "Diablo IV": ("Diablo IV", "https://images.igdb.com/igdb/image/upload/t_1080p/sc7p3m.jpg"),
+            "counter-strike 2": ("Counter-Strike 2", "https://images.igdb.com/igdb/image/upload/t_1080p/sclp5f.jpg"),
+            "Path of Exile": None,
+            "Unknown Title": None,
+        })
+        self.assertEqual([endpoint for endpoint, _ in manager.requests], ['multiquery', 'screenshots'])
+        # Only the first screenshot of each match is resolved
+        self.assertIn("where id = (745210,1012803);", manager.requests[1][1])
+
+
+if __name__ == "__main__":
+    unittest.main()